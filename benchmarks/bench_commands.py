@@ -0,0 +1,135 @@
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+from types import SimpleNamespace
+from typing import List, Tuple, Callable, Awaitable, Any
+
+from benchmarks.fakes import FixtureServer, StubInteraction
+from cogs.weather import Weather
+from utils.cache import WeatherCache
+from utils.locations import LocationResolver
+from utils.weather_client import WeatherClient
+
+
+CONCURRENCY = (1, 100, 1000)
+
+Command = Callable[..., Awaitable[Any]]
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+async def run_round(
+    bot: Any,
+    command: Command,
+    cities: List[str]
+) -> Tuple[List[float], int]:
+    async def invoke(city: str) -> Tuple[float, bool]:
+        interaction = StubInteraction(bot)
+        start = time.perf_counter()
+        await command(interaction, city)
+        return time.perf_counter() - start, len(interaction.followup.messages) == 1
+
+    results = await asyncio.gather(*(invoke(city) for city in cities))
+    return [elapsed for elapsed, _ in results], sum(1 for _, ok in results if not ok)
+
+
+async def bench(
+    bot: Any,
+    command: Command,
+    concurrency: int,
+    total: int,
+    cached: bool
+) -> Tuple[float, float, float, int, float]:
+    rounds = max(1, -(-total // concurrency))
+
+    def cities(round: int) -> List[str]:
+        if cached:
+            return ['London'] * concurrency
+        # Distinct cities, so every interaction is a cache miss
+        return [f'City {round}-{i}' for i in range(concurrency)]
+
+    if cached:
+        await bot.weather.forecast('London', 3)
+
+    latencies: List[float] = []
+    failures = 0
+    start = time.perf_counter()
+    for i in range(rounds):
+        elapsed, failed = await run_round(bot, command, cities(i))
+        latencies.extend(elapsed)
+        failures += failed
+    throughput = len(latencies) / (time.perf_counter() - start)
+
+    tracemalloc.start()
+    await run_round(bot, command, cities(rounds))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (
+        throughput,
+        percentile(latencies, 0.5),
+        percentile(latencies, 0.99),
+        failures,
+        peak / concurrency
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    server = FixtureServer(port=args.port, latency=args.latency)
+    await server.start()
+
+    cache = WeatherCache(max_size=max(args.concurrency) * 2)
+    weather = WeatherClient('benchmark', base_url=server.base_url, cache=cache)
+    # data_dir only names the digest subscriptions file, which isn't written here
+    bot = SimpleNamespace(weather=weather, weather_cache=cache, data_dir=tempfile.gettempdir())
+    cog = Weather(bot)  # type: ignore
+
+    commands = [
+        ('current', lambda i, city: cog.weather_current.callback(cog, i, city)),
+        ('forecast', lambda i, city: cog.weather_forecast.callback(cog, i, city)),
+    ]
+
+    print(
+        f'Fixture server latency: {args.latency * 1000:.0f}ms, '
+        f'{args.requests} interactions per case\n'
+    )
+    print(
+        f'{"command":<10}{"cache":<8}{"concurrency":>12}{"req/s":>10}'
+        f'{"p50":>11}{"p99":>11}{"peak/req":>13}{"failed":>8}'
+    )
+
+    try:
+        for name, command in commands:
+            for cached in (True, False):
+                for concurrency in args.concurrency:
+                    # Aliases learned in earlier cases would turn cold misses into hits
+                    cache.clear()
+                    weather.locations = LocationResolver()
+                    throughput, p50, p99, failures, peak = await bench(
+                        bot, command, concurrency, args.requests, cached
+                    )
+                    print(
+                        f'{name:<10}{"warm" if cached else "cold":<8}{concurrency:>12}'
+                        f'{throughput:>10.0f}{p50 * 1000:>8.2f} ms{p99 * 1000:>8.2f} ms'
+                        f'{peak / 1024:>9.1f} KiB{failures:>8}'
+                    )
+    finally:
+        await weather.close()
+        await server.close()
+
+    print(f'\nUpstream requests served: {server.requests}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the /weather commands offline')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=list(CONCURRENCY))
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--port', type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,144 @@
+import json
+import time
+
+from pathlib import Path
+from typing import Callable, Any, List
+
+import discord
+
+from utils.translator import Translator, TranslatorCallable
+from utils.types import WeatherData
+from utils.renderer import render_current, render_forecast
+
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'forecast.json'
+LOCALES = ('pt-BR', 'en-US', 'es-ES')
+
+ITERATIONS = 5000
+
+
+# Embeds built from scratch on every request, as the cog used to do
+
+def _classify_uv_index(t: TranslatorCallable, uv_index: int) -> str:
+    match uv_index:
+        case 0 | 1 | 2 | 3:
+            return t('commands.weather.uv_index_rating.low')
+        case 4 | 5 | 6:
+            return t('commands.weather.uv_index_rating.moderate')
+        case 7 | 8:
+            return t('commands.weather.uv_index_rating.high')
+        case 9 | 10 | 11:
+            return t('commands.weather.uv_index_rating.very_high')
+        case _:
+            return t('commands.weather.uv_index_rating.extreme')
+
+
+def build_current(t: TranslatorCallable, data: WeatherData) -> discord.Embed:
+    day_or_night = 'day' if data.current.is_day else 'night'
+    embed = discord.Embed(
+        title=f'{data.location.name}, {data.location.country}',
+        description=t(f'commands.weather.codes.{data.current.condition_code}.{day_or_night}'),
+        color=0x5ea3d8,
+        timestamp=data.current.last_updated
+    )
+    embed.add_field(
+        name='🌡 ' + t('commands.weather.temperature'),
+        value=f'{data.current.temp_c}° C | {data.current.temp_f}° F',
+        inline=False
+    )
+    embed.add_field(
+        name='💧 ' + t('commands.weather.humidity'),
+        value=f'{data.current.humidity}%',
+        inline=False
+    )
+    embed.add_field(
+        name='💨 ' + t('commands.weather.wind_speed'),
+        value=f'{data.current.wind_kph} km/h',
+        inline=False
+    )
+    embed.add_field(
+        name='☀ ' + t('commands.weather.uv_index'),
+        value=_classify_uv_index(t, int(data.current.uv)),
+        inline=False
+    )
+    embed.set_footer(
+        text='https://www.weatherapi.com/' + ' | ' + t('commands.weather.last_updated')
+    )
+    embed.set_thumbnail(url='https:' + data.current.condition_icon)
+    return embed
+
+
+def build_forecast(t: TranslatorCallable, data: WeatherData) -> List[discord.Embed]:
+    day_or_night = 'day' if data.current.is_day else 'night'
+    embeds = []
+    for i, day in enumerate(data.forecast, 1):
+        embed = discord.Embed(
+            title=discord.utils.format_dt(day.date, 'd'),
+            description=t(f'commands.weather.codes.{day.condition_code}.{day_or_night}'),
+            color=0x5ea3d8
+        )
+        if i == 1:
+            embed.set_author(name=f'{data.location.name}, {data.location.country}')
+        embed.add_field(
+            name='🌡 ' + t('commands.weather.temperature'),
+            value=(
+                f'🔼 {day.maxtemp_c}° C | {day.maxtemp_f}° F\n'
+                f'🔽 {day.mintemp_c}° C | {day.mintemp_f}° F'
+            )
+        )
+        if day.daily_chance_of_rain > 0:
+            embed.add_field(
+                name='🌧 ' + t('commands.weather.chance_of_rain'),
+                value=f'{day.daily_chance_of_rain}%'
+            )
+        if day.daily_chance_of_snow > 0:
+            embed.add_field(
+                name='❄ ' + t('commands.weather.chance_of_snow'),
+                value=f'{day.daily_chance_of_snow}%'
+            )
+        embed.set_thumbnail(url='https:' + data.current.condition_icon)
+        if i == len(data.forecast):
+            embed.set_footer(
+                text='https://www.weatherapi.com/' + ' | ' + t('commands.weather.last_updated')
+            )
+            embed.timestamp = data.current.last_updated
+        embeds.append(embed)
+    return embeds
+
+
+def measure(func: Callable[[Translator, WeatherData], Any], data: WeatherData) -> float:
+    translators = [Translator(locale) for locale in LOCALES]
+    for t in translators:
+        func(t, data)
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        func(translators[i % len(translators)], data)
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def main() -> None:
+    Translator.load_locales(str(Path(__file__).parent.parent / 'locales'))
+
+    data = WeatherData(json.loads(FIXTURE.read_bytes()))
+    data.current, data.forecast
+
+    cases = [
+        ('current', build_current, render_current),
+        ('forecast', build_forecast, render_forecast),
+    ]
+
+    print(f'{ITERATIONS} iterations over {len(LOCALES)} locales\n')
+    print(f'{"embed":<12}{"from scratch":>16}{"templates":>16}')
+
+    for name, before, after in cases:
+        elapsed_before = measure(before, data)
+        elapsed_after = measure(after, data)
+        print(
+            f'{name:<12}{elapsed_before * 1e6:>13.1f} µs{elapsed_after * 1e6:>13.1f} µs'
+            f'  x{elapsed_before / elapsed_after:.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
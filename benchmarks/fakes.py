@@ -0,0 +1,120 @@
+import asyncio
+import discord
+
+from aiohttp import web
+from pathlib import Path
+
+from typing import Any, Dict, List, Optional
+
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+class FixtureServer:
+    # Local stand-in for WeatherAPI that answers every request with a
+    # recorded response after a fixed delay, or with error.json and the
+    # given status while status isn't 200.
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 8765,
+        *,
+        latency: float = 0.05
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.latency: float = latency
+        self.status: int = 200
+        self.requests: int = 0
+
+        self._fixtures: Dict[str, bytes] = {
+            path.name: path.read_bytes() for path in FIXTURES.glob('*.json')
+        }
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}/v1'
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.status != 200:
+            return web.Response(
+                status=self.status,
+                body=self._fixtures['error.json'],
+                content_type='application/json'
+            )
+
+        body = self._fixtures.get(request.match_info['endpoint'])
+        if body is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=body, content_type='application/json')
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_route('*', '/v1/{endpoint}', self._handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class StubResponse:
+    def __init__(self) -> None:
+        self.deferred: bool = False
+        self.messages: List[Dict[str, Any]] = []
+
+    def is_done(self) -> bool:
+        return self.deferred or bool(self.messages)
+
+    async def defer(self, **kwargs: Any) -> None:
+        self.deferred = True
+
+    async def send_message(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        self.messages.append({'content': content, **kwargs})
+
+    async def edit_message(self, **kwargs: Any) -> None:
+        self.messages.append(kwargs)
+
+
+class StubFollowup:
+    def __init__(self) -> None:
+        self.messages: List[Dict[str, Any]] = []
+
+    async def send(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        self.messages.append({'content': content, **kwargs})
+
+
+class StubInteraction:
+    # Implements the parts of discord.Interaction used by the commands and
+    # records what would have been sent to Discord.
+    def __init__(
+        self,
+        client: Any,
+        *,
+        locale: discord.Locale = discord.Locale.brazil_portuguese,
+        user_id: int = 1,
+        channel_id: int = 1,
+        guild_id: Optional[int] = None
+    ) -> None:
+        self.client: Any = client
+        self.locale: discord.Locale = locale
+        self.guild_locale: Optional[discord.Locale] = locale if guild_id else None
+        self.user: discord.Object = discord.Object(id=user_id)
+        self.channel_id: int = channel_id
+        self.guild_id: Optional[int] = guild_id
+        self.guild: Optional[discord.Object] = discord.Object(id=guild_id) if guild_id else None
+
+        self.response: StubResponse = StubResponse()
+        self.followup: StubFollowup = StubFollowup()
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        return self.response.messages + self.followup.messages
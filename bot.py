@@ -1,10 +1,35 @@
-import aiohttp
+import os
+import json
+import asyncio
+import time
+import hashlib
+import yarl
 import discord
 import logging
 
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+from typing import Optional, Dict, List, Any
 
 from utils.translator import CommandTranslator, Translator
+from utils.cache import WeatherCache, RedisBackend
+from utils.weather_client import WeatherClient
+from utils.locations import LocationResolver
+from utils.cities import CityIndex
+from utils.ratelimit import TokenBucket, QuotaBudget
+from utils.circuit import CircuitBreaker
+from utils.snapshot import CacheSnapshot, DEFAULT_SNAPSHOT_INTERVAL
+from utils.preferences import LocationPreferences, DEFAULT_FLUSH_INTERVAL
+from utils import cards
+from utils.metrics import (
+    MetricsServer,
+    GATEWAY_LATENCY_SECONDS,
+    SHARD_LATENCY_SECONDS,
+    WEATHERAPI_RATE_LIMIT_TOKENS,
+    WEATHERAPI_QUOTA_USED,
+    WEATHERAPI_QUOTA_LIMIT,
+    WEATHERAPI_CIRCUIT_STATE
+)
 
 
 log = logging.getLogger(__name__)
@@ -14,20 +39,47 @@ INITIAL_EXTENSIONS = (
     'cogs.weather',
     'cogs.error_handler',
     'cogs.misc',
+    'cogs.alerts',
 )
 
 
+COMMANDS_HASH_FILE = 'commands_hash.json'
+QUOTA_FILE = 'weatherapi_quota.json'
+DEFAULT_QUOTA_SAVE_INTERVAL = 30
+SNAPSHOT_FILE = 'weather_snapshot.bin'
+DEFAULT_PREWARM_INTERVAL = 60
+PREFERENCES_FILE = 'preferences.db'
+
+
 Translator.load_locales('./locales')
 
 
 class BotCore(commands.Bot):
-    def __init__(self, test_guild_id: int | None = None) -> None:
+    def __init__(
+        self,
+        test_guild_id: int | None = None,
+        *,
+        force_sync: bool = False,
+        **options: Any
+    ) -> None:
         super().__init__(
             command_prefix=commands.when_mentioned,
             help_command=None,
-            intents=discord.Intents.default()
+            intents=discord.Intents.default(),
+            **options
         )
         self.test_guild_id: int | None = None
+        self.force_sync: bool = force_sync
+        self.data_dir: str = os.getenv('DATA_DIR', 'data')
+        self.metrics_server: Optional[MetricsServer] = None
+        self.snapshot: Optional[CacheSnapshot] = None
+        self.prewarm_count: int = int(os.getenv('PREWARM_TOP_K', 50))
+        self.prewarm_budget: int = int(os.getenv('PREWARM_BUDGET', 10))
+
+        self.weather_cache: WeatherCache = WeatherCache(
+            max_size=int(os.getenv('WEATHER_CACHE_SIZE', 1024)),
+            refresh_interval=float(os.getenv('WEATHER_CACHE_REFRESH_INTERVAL', 900))
+        )
 
         if test_guild_id:
             self.test_guild_id = int(test_guild_id)
@@ -39,23 +91,281 @@ class BotCore(commands.Bot):
         log.info(f'Connected in: {self.user} ({self.user.id})')
 
     async def setup_hook(self) -> None:
-        self.session: aiohttp.ClientSession = aiohttp.ClientSession()
+        metrics_port = os.getenv('METRICS_PORT')
+        if metrics_port:
+            self.metrics_server = MetricsServer(
+                os.getenv('METRICS_HOST', '127.0.0.1'),
+                int(metrics_port)
+            )
+            await self.metrics_server.start()
+        GATEWAY_LATENCY_SECONDS.set_function(lambda: self.latency)
+
+        rate_limiter = TokenBucket(
+            float(os.getenv('WEATHER_API_RATE_LIMIT', 5)),
+            float(os.getenv('WEATHER_API_RATE_LIMIT_BURST', 10))
+        )
+        WEATHERAPI_RATE_LIMIT_TOKENS.set_function(lambda: rate_limiter.tokens)
+
+        quota: Optional[QuotaBudget] = None
+        monthly_quota = os.getenv('WEATHER_API_MONTHLY_QUOTA')
+        if monthly_quota:
+            os.makedirs(self.data_dir, exist_ok=True)
+            quota = QuotaBudget(int(monthly_quota), path=os.path.join(self.data_dir, QUOTA_FILE))
+            await asyncio.to_thread(quota.load)
+            WEATHERAPI_QUOTA_USED.set_function(lambda: quota.used)
+            WEATHERAPI_QUOTA_LIMIT.set(quota.limit)
+            log.info(f'WeatherAPI quota: {quota.used}/{quota.limit} requests used this month')
+
+        circuit = CircuitBreaker(
+            int(os.getenv('WEATHER_API_CIRCUIT_THRESHOLD', 5)),
+            float(os.getenv('WEATHER_API_CIRCUIT_RECOVERY', 30)),
+            name='WeatherAPI'
+        )
+        WEATHERAPI_CIRCUIT_STATE.set_function(lambda: circuit.state)
+
+        redis_url = os.getenv('REDIS_URL')
+        self.weather: WeatherClient = WeatherClient(
+            os.environ.get('WEATHER_API_KEY', ''),
+            cache=self.weather_cache,
+            shared_cache=RedisBackend(redis_url) if redis_url else None,
+            locations=LocationResolver(int(os.getenv('LOCATION_ALIASES_SIZE', 8192))),
+            rate_limiter=rate_limiter,
+            quota=quota,
+            circuit=circuit,
+            stale_while_revalidate=float(os.getenv('WEATHER_CACHE_STALE_WHILE_REVALIDATE', 1800))
+        )
+        if quota is not None:
+            # Saved periodically so a crash doesn't reset the month's usage
+            quota_save_interval = os.getenv('WEATHER_API_QUOTA_SAVE_INTERVAL')
+            self.save_quota.change_interval(
+                seconds=float(quota_save_interval or DEFAULT_QUOTA_SAVE_INTERVAL)
+            )
+            self.save_quota.start()
 
-        await self.tree.set_translator(CommandTranslator())
+        snapshot_interval = float(os.getenv('CACHE_SNAPSHOT_INTERVAL', DEFAULT_SNAPSHOT_INTERVAL))
+        if snapshot_interval > 0:
+            self.snapshot = CacheSnapshot(
+                os.path.join(self.data_dir, SNAPSHOT_FILE),
+                self.weather_cache,
+                self.weather.locations
+            )
+            restored = await self.snapshot.load()
+            log.info(f'Restored {restored} cached forecasts from the snapshot')
+            self.save_snapshot.change_interval(seconds=snapshot_interval)
+            self.save_snapshot.start()
+
+        prewarm_interval = float(os.getenv('PREWARM_INTERVAL', DEFAULT_PREWARM_INTERVAL))
+        if prewarm_interval > 0 and self.prewarm_budget > 0:
+            self.prewarm_cache.change_interval(seconds=prewarm_interval)
+            self.prewarm_cache.start()
+
+        self.cards: Optional[cards.CardRenderer] = None
+        if cards.Image is not None:
+            self.cards = cards.CardRenderer(
+                self.weather.session,
+                os.path.join(self.data_dir, 'icons'),
+                workers=int(os.getenv('CARD_RENDER_WORKERS', cards.DEFAULT_WORKERS))
+            )
+        else:
+            log.info('Pillow is not installed, weather cards are disabled')
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.preferences: LocationPreferences = LocationPreferences(
+            os.path.join(self.data_dir, PREFERENCES_FILE),
+            cache_size=int(os.getenv('PREFERENCES_CACHE_SIZE', 4096))
+        )
+        await self.preferences.open()
+        self.flush_preferences.change_interval(
+            seconds=float(os.getenv('PREFERENCES_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL))
+        )
+        self.flush_preferences.start()
+
+        self.cities: CityIndex = await asyncio.to_thread(CityIndex.load)
+        log.info(f'Loaded {len(self.cities)} cities')
+
+        translator = CommandTranslator()
+        await self.tree.set_translator(translator)
 
         for ext in INITIAL_EXTENSIONS:
             await self.load_extension(ext)
             log.info(f'Extension {ext} loaded successfully')
 
+        start = time.perf_counter()
         if self.test_guild_id:
             test_guild = discord.Object(id=self.test_guild_id)
             self.tree.copy_global_to(guild=test_guild)
-            log.debug(f'Syncing commands on: {test_guild.id}')
-            await self.tree.sync(guild=test_guild)
+            synced = await self._sync_commands(translator, test_guild)
+        else:
+            synced = await self._sync_commands(translator)
+
+        if synced:
+            log.info(
+                f'Synchronized commands in {time.perf_counter() - start:.2f}s '
+                f'(translated {translator.calls} strings in {translator.elapsed * 1000:.1f}ms, '
+                f'{translator.cache_hits} from cache)'
+            )
         else:
-            await self.tree.sync()
-        log.info('Synchronized commands')
+            log.info('Commands are up to date, skipping sync')
+
+    def _load_commands_hashes(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.data_dir, COMMANDS_HASH_FILE), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_commands_hashes(self, hashes: Dict[str, str]) -> None:
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(os.path.join(self.data_dir, COMMANDS_HASH_FILE), 'w') as f:
+            json.dump(hashes, f, indent=4)
+
+    async def _sync_commands(
+        self,
+        translator: CommandTranslator,
+        guild: Optional[discord.Object] = None
+    ) -> bool:
+        payload = [
+            await command.get_translated_payload(self.tree, translator)
+            for command in self.tree.get_commands(guild=guild)
+        ]
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+
+        scope = f'{self.application_id}:{guild.id if guild else "global"}'
+        hashes = self._load_commands_hashes()
+        if not self.force_sync and hashes.get(scope) == digest:
+            return False
+
+        if guild:
+            log.debug(f'Syncing commands on: {guild.id}')
+        await self.tree.sync(guild=guild)
+
+        hashes[scope] = digest
+        self._save_commands_hashes(hashes)
+        return True
+
+    @tasks.loop(seconds=DEFAULT_SNAPSHOT_INTERVAL)
+    async def save_snapshot(self) -> None:
+        assert self.snapshot is not None
+        try:
+            saved = await self.snapshot.save()
+        except Exception as e:
+            log.warning('Failed to save the cache snapshot', exc_info=e)
+        else:
+            log.debug(f'Saved {saved} cached forecasts to the snapshot')
+
+    @tasks.loop(seconds=DEFAULT_PREWARM_INTERVAL)
+    async def prewarm_cache(self) -> None:
+        # Entries that would expire before the next run are refreshed now
+        try:
+            refreshed = await self.weather.prewarm(
+                self.prewarm_count,
+                self.prewarm_budget,
+                self.prewarm_cache.seconds
+            )
+        except Exception as e:
+            log.warning('Failed to prewarm the weather cache', exc_info=e)
+        else:
+            if refreshed:
+                log.debug(f'Prewarmed {refreshed} popular forecasts')
+
+    @tasks.loop(seconds=DEFAULT_FLUSH_INTERVAL)
+    async def flush_preferences(self) -> None:
+        try:
+            await self.preferences.flush()
+        except Exception as e:
+            log.warning('Failed to save the default locations', exc_info=e)
+
+    @tasks.loop(seconds=DEFAULT_QUOTA_SAVE_INTERVAL)
+    async def save_quota(self) -> None:
+        quota = self.weather.quota
+        assert quota is not None
+        if not quota.dirty:
+            return
+        try:
+            await asyncio.to_thread(quota.save)
+        except Exception as e:
+            log.warning('Failed to save the WeatherAPI quota usage', exc_info=e)
 
     async def close(self) -> None:
-        await self.session.close()
+        self.save_quota.cancel()
+        self.prewarm_cache.cancel()
+        self.flush_preferences.cancel()
+        await self.preferences.close()
+        if self.snapshot is not None:
+            self.save_snapshot.cancel()
+            await self.save_snapshot()
+        if self.cards is not None:
+            self.cards.close()
+        await self.weather.close()
+        if self.weather.quota is not None:
+            await asyncio.to_thread(self.weather.quota.save)
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
         return await super().close()
+
+
+class ShardedBotCore(BotCore, commands.AutoShardedBot):
+    def __init__(
+        self,
+        test_guild_id: int | None = None,
+        *,
+        shard_count: Optional[int] = None,
+        shard_ids: Optional[List[int]] = None,
+        **options: Any
+    ) -> None:
+        super().__init__(
+            test_guild_id,
+            shard_count=shard_count,
+            shard_ids=shard_ids,
+            **options
+        )
+
+    async def setup_hook(self) -> None:
+        await super().setup_hook()
+        SHARD_LATENCY_SECONDS.set_function(
+            lambda: {(str(shard_id),): latency for shard_id, latency in self.latencies}
+        )
+
+    async def on_shard_ready(self, shard_id: int) -> None:
+        log.info(f'Shard {shard_id} is ready')
+
+    async def launch_shards(self) -> None:
+        if self.is_closed():
+            return
+
+        recommended_shards, gateway_url, limits = await self.http.get_bot_gateway()
+        if self.shard_count is None:
+            self.shard_count = recommended_shards
+        gateway = yarl.URL(gateway_url)
+
+        self._connection.shard_count = self.shard_count
+        shard_ids = self.shard_ids or list(range(self.shard_count))
+        self._connection.shard_ids = shard_ids
+
+        if limits['remaining'] < len(shard_ids):
+            log.warning(
+                f'Only {limits["remaining"]} session starts remaining '
+                f'for {len(shard_ids)} shards'
+            )
+
+        # Shards with different rate limit keys can identify at the same
+        # time. Shards sharing a key are launched one after another and
+        # before_identify_hook spaces their IDENTIFYs.
+        max_concurrency = limits.get('max_concurrency', 1)
+        buckets: Dict[int, List[int]] = {}
+        for shard_id in shard_ids:
+            buckets.setdefault(shard_id % max_concurrency, []).append(shard_id)
+
+        log.info(
+            f'Launching {len(shard_ids)} of {self.shard_count} shards '
+            f'with max concurrency {max_concurrency}'
+        )
+        await asyncio.gather(*(
+            self._launch_bucket(gateway, bucket) for bucket in buckets.values()
+        ))
+
+    async def _launch_bucket(self, gateway: yarl.URL, shard_ids: List[int]) -> None:
+        for shard_id in shard_ids:
+            await self.launch_shard(gateway, shard_id, initial=shard_id == shard_ids[0])
@@ -0,0 +1,308 @@
+import os
+import random
+import asyncio
+import logging
+import discord
+
+from discord import app_commands
+from discord.app_commands import locale_str as _T
+from discord.ext import commands, tasks
+
+from bot import BotCore
+
+from typing import Dict, Set, Tuple, List
+
+from utils.translator import Translator
+from utils.embed import Embed
+from utils.types import WeatherData, WeatherAlert
+from utils.subscriptions import AlertSubscriptions
+from utils.weather_client import WeatherAPIError
+from utils.errors import WeatherUnavailable
+from utils.cities import city_autocomplete
+
+
+log = logging.getLogger(__name__)
+
+ALERTS_POLL_INTERVAL = float(os.getenv('ALERTS_POLL_INTERVAL', 900))
+ALERTS_POLL_CONCURRENCY = int(os.getenv('ALERTS_POLL_CONCURRENCY', 5))
+MAX_SUBSCRIPTIONS_PER_CHANNEL = 10
+
+# Discord limits
+EMBED_TITLE_LIMIT = 256
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBEDS_PER_MESSAGE = 10
+MESSAGE_EMBEDS_LIMIT = 6000
+
+
+class Alerts(commands.Cog):
+    def __init__(self, bot: BotCore) -> None:
+        self.bot: BotCore = bot
+        self.subscriptions: AlertSubscriptions = AlertSubscriptions(
+            os.path.join(bot.data_dir, 'alert_subscriptions.json')
+        )
+
+        # Alerts already seen per location, identified by (headline, effective)
+        self._seen: Dict[str, Set[Tuple[str, str]]] = {}
+
+    async def cog_load(self) -> None:
+        await asyncio.to_thread(self.subscriptions.load)
+        self.poll_alerts.start()
+
+    async def cog_unload(self) -> None:
+        self.poll_alerts.cancel()
+
+    @tasks.loop(seconds=ALERTS_POLL_INTERVAL)
+    async def poll_alerts(self) -> None:
+        locations = list(self.subscriptions.locations)
+        if not locations:
+            return
+        random.shuffle(locations)
+
+        # Spread the polls over the interval with some jitter instead of
+        # hitting the API with every location at once.
+        loop = asyncio.get_running_loop()
+        slot = ALERTS_POLL_INTERVAL * 0.9 / len(locations)
+        start = loop.time()
+
+        semaphore = asyncio.Semaphore(ALERTS_POLL_CONCURRENCY)
+        pending: Set[asyncio.Task] = set()
+
+        for i, location in enumerate(locations):
+            delay = start + slot * (i + random.random()) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await semaphore.acquire()
+            task = asyncio.create_task(self._poll_location(location))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    @poll_alerts.before_loop
+    async def before_poll_alerts(self) -> None:
+        await self.bot.wait_until_ready()
+
+    async def _poll_location(self, location: str) -> None:
+        # An exception escaping to the loop would stop polling until a restart
+        try:
+            await self._check_location(location)
+        except Exception as e:
+            log.error(f'Failed to check alerts for {location}', exc_info=e)
+
+    async def _check_location(self, location: str) -> None:
+        if location not in self.subscriptions.locations:
+            self._seen.pop(location, None)
+            return
+
+        try:
+            data = await self.bot.weather.forecast(location, 1)
+        except Exception as e:
+            log.warning(f'Failed to poll alerts for {location}', exc_info=e)
+            return
+
+        current = {(alert.headline, alert.effective_iso): alert for alert in data.alerts}
+        previous = self._seen.get(location)
+
+        # The first poll only records the active alerts
+        if previous is None:
+            self._seen[location] = set(current)
+            return
+
+        new_alerts = [alert for key, alert in current.items() if key not in previous]
+        # Alerts that couldn't be delivered anywhere are retried on the next poll
+        if not new_alerts or await self._notify(location, data, new_alerts):
+            self._seen[location] = set(current)
+
+    def _truncate(self, text: str, limit: int) -> str:
+        return text if len(text) <= limit else text[:limit - 1] + '…'
+
+    def _build_alert_messages(
+        self,
+        locale: str,
+        data: WeatherData,
+        alerts: List[WeatherAlert]
+    ) -> Tuple[str, List[List[discord.Embed]]]:
+        t = Translator(locale)
+        content = t(
+            'commands.alerts.new_alert',
+            location=f'{data.location.name}, {data.location.country}'
+        )
+
+        # Alert descriptions are often thousands of characters long, so the
+        # embeds are split in as many messages as Discord's limits require.
+        messages: List[List[discord.Embed]] = []
+        size = 0
+        for alert in alerts:
+            embed = discord.Embed(
+                title=self._truncate(alert.headline, EMBED_TITLE_LIMIT),
+                description=self._truncate(alert.desc, EMBED_DESCRIPTION_LIMIT),
+                color=discord.Colour.brand_red(),
+                timestamp=alert.effective
+            )
+            if not messages or len(messages[-1]) >= EMBEDS_PER_MESSAGE or \
+                    size + len(embed) > MESSAGE_EMBEDS_LIMIT:
+                messages.append([])
+                size = 0
+            messages[-1].append(embed)
+            size += len(embed)
+        return content, messages
+
+    async def _notify(self, location: str, data: WeatherData, alerts: List[WeatherAlert]) -> bool:
+        # Returns whether the alerts reached at least one channel, or there
+        # are no channels left to send them to.
+        rendered: Dict[str, Tuple[str, List[List[discord.Embed]]]] = {}
+        channels = list(self.subscriptions.locations.get(location, {}).items())
+        delivered = False
+        removed = False
+
+        for channel_id, locale in channels:
+            if locale not in rendered:
+                rendered[locale] = self._build_alert_messages(locale, data, alerts)
+            content, messages = rendered[locale]
+
+            try:
+                channel = (
+                    self.bot.get_channel(channel_id) or
+                    await self.bot.fetch_channel(channel_id)
+                )
+                for i, embeds in enumerate(messages):
+                    # Only the first message is introduced by the content
+                    await channel.send(content if i == 0 else None, embeds=embeds)  # type: ignore
+                delivered = True
+            except (discord.NotFound, discord.Forbidden):
+                log.info(f'Removing alert subscriptions of unavailable channel {channel_id}')
+                self.subscriptions.remove_channel(channel_id)
+                removed = True
+            except discord.HTTPException as e:
+                log.warning(f'Failed to send alerts to channel {channel_id}', exc_info=e)
+
+        if removed:
+            try:
+                await self.subscriptions.save()
+            except OSError as e:
+                log.error('Failed to save alert subscriptions', exc_info=e)
+        return delivered or location not in self.subscriptions.locations
+
+    alerts = app_commands.Group(
+        name=_T('alerts', id='commands.alerts.name'),
+        description=_T('...', id='commands.alerts.description'),
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_channels=True)
+    )
+
+    @alerts.command(
+        name=_T('subscribe', id='commands.alerts.subscribe.name'),
+        description=_T('...', id='commands.alerts.subscribe.description')
+    )
+    @app_commands.rename(
+        city=_T('city', id='commands.alerts.subscribe.options.city.name')
+    )
+    @app_commands.describe(
+        city=_T('...', id='commands.alerts.subscribe.options.city.description')
+    )
+    @app_commands.autocomplete(city=city_autocomplete)
+    @app_commands.checks.cooldown(1, 5)
+    async def alerts_subscribe(self, interaction: discord.Interaction, city: str):
+        t = Translator(interaction.locale)
+        await interaction.response.defer(ephemeral=True)
+
+        channel_id = interaction.channel_id
+        assert channel_id is not None
+
+        if len(self.subscriptions.get_channel_locations(channel_id)) >= \
+                MAX_SUBSCRIPTIONS_PER_CHANNEL:
+            embed = Embed.error(
+                t('commands.alerts.limit_reached', limit=MAX_SUBSCRIPTIONS_PER_CHANNEL)
+            )
+            return await interaction.followup.send(embed=embed)
+
+        try:
+            data = await self.bot.weather.forecast(city, 1)
+        except WeatherAPIError as e:
+            return await interaction.followup.send(embed=Embed.api_error(t, e.code))
+        except WeatherUnavailable as e:
+            return await interaction.followup.send(embed=Embed.error(t(e.translation_id)))
+        except Exception as e:
+            log.error('Request error', exc_info=e)
+            embed = Embed.error(t('errors.request_error'))
+            return await interaction.followup.send(embed=embed)
+
+        # Subscriptions are keyed by coordinates so different spellings of
+        # the same place are polled only once.
+        location = data.location.coordinates
+        name = f'{data.location.name}, {data.location.country}'
+        locale = (interaction.guild_locale or interaction.locale).value
+
+        if not self.subscriptions.subscribe(channel_id, location, name, locale):
+            embed = Embed.error(t('commands.alerts.already_subscribed', location=name))
+            return await interaction.followup.send(embed=embed)
+
+        await self.subscriptions.save()
+        embed = Embed.success(t('commands.alerts.subscribed', location=name))
+        await interaction.followup.send(embed=embed)
+
+    @alerts.command(
+        name=_T('unsubscribe', id='commands.alerts.unsubscribe.name'),
+        description=_T('...', id='commands.alerts.unsubscribe.description')
+    )
+    @app_commands.rename(
+        location=_T('city', id='commands.alerts.unsubscribe.options.city.name')
+    )
+    @app_commands.describe(
+        location=_T('...', id='commands.alerts.unsubscribe.options.city.description')
+    )
+    async def alerts_unsubscribe(self, interaction: discord.Interaction, location: str):
+        t = Translator(interaction.locale)
+
+        channel_id = interaction.channel_id
+        assert channel_id is not None
+
+        name = self.subscriptions.names.get(location, location)
+        if not self.subscriptions.unsubscribe(channel_id, location):
+            embed = Embed.error(t('commands.alerts.not_subscribed'))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        await self.subscriptions.save()
+        embed = Embed.success(t('commands.alerts.unsubscribed', location=name))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @alerts_unsubscribe.autocomplete('location')
+    async def alerts_unsubscribe_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[str]]:
+        assert interaction.channel_id is not None
+        current = current.casefold()
+        return [
+            app_commands.Choice(name=name, value=location)
+            for location, name in self.subscriptions.get_channel_locations(interaction.channel_id)
+            if current in name.casefold()
+        ][:25]
+
+    @alerts.command(
+        name=_T('list', id='commands.alerts.list.name'),
+        description=_T('...', id='commands.alerts.list.description')
+    )
+    async def alerts_list(self, interaction: discord.Interaction):
+        t = Translator(interaction.locale)
+
+        assert interaction.channel_id is not None
+        locations = self.subscriptions.get_channel_locations(interaction.channel_id)
+        if not locations:
+            embed = Embed.error(t('commands.alerts.list_empty'))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        embed = discord.Embed(
+            title='⚠ ' + t('commands.alerts.list_title'),
+            description='\n'.join(f'• {name}' for _, name in sorted(locations, key=lambda x: x[1])),
+            color=0x5ea3d8
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: BotCore) -> None:
+    await bot.add_cog(Alerts(bot))
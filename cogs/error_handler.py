@@ -11,6 +11,7 @@ from bot import BotCore
 
 from utils.translator import Translator
 from utils.embed import Embed
+from utils.metrics import COMMAND_COOLDOWN_REJECTIONS
 
 
 log = logging.getLogger(__name__)
@@ -29,6 +30,9 @@ class ErrorHandler(commands.Cog):
         t = Translator(interaction.locale)
         match error:
             case CommandOnCooldown():
+                COMMAND_COOLDOWN_REJECTIONS.inc(
+                    command=interaction.command.qualified_name if interaction.command else ''
+                )
                 embed = Embed.error(
                     t('errors.command_on_cooldown', retry_after=f'{error.retry_after:.2f}')
                 )
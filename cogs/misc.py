@@ -13,6 +13,8 @@ from utils.translator import Translator
 
 log = logging.getLogger(__name__)
 
+MAX_SHARDS_SHOWN = 20
+
 
 class Misc(commands.Cog):
     def __init__(self, bot: BotCore) -> None:
@@ -36,7 +38,14 @@ class Misc(commands.Cog):
     async def ping(self, interaction: discord.Interaction):
         t = Translator(interaction.locale)
 
-        latency = round(self.bot.latency * 1000)
+        shard = None
+        if isinstance(self.bot, discord.AutoShardedClient) and interaction.guild:
+            shard = self.bot.get_shard(interaction.guild.shard_id)
+
+        if shard is not None:
+            latency = round(shard.latency * 1000)
+        else:
+            latency = round(self.bot.latency * 1000)
 
         e = self._get_latency_emoji(latency) + ' '
 
@@ -46,6 +55,21 @@ class Misc(commands.Cog):
             color=self._get_latency_color(latency)
         )
 
+        if isinstance(self.bot, discord.AutoShardedClient):
+            lines = []
+            for shard_id, shard_latency in self.bot.latencies[:MAX_SHARDS_SHOWN]:
+                shard_latency = round(shard_latency * 1000)
+                lines.append(
+                    f'{self._get_latency_emoji(shard_latency)} '
+                    f'`#{shard_id}` `{shard_latency}ms`'
+                )
+            if len(self.bot.latencies) > MAX_SHARDS_SHOWN:
+                lines.append(f'+{len(self.bot.latencies) - MAX_SHARDS_SHOWN}')
+
+            embed.add_field(name=t('commands.ping.shards'), value='\n'.join(lines))
+            if shard is not None:
+                embed.set_footer(text=t('commands.ping.current_shard', shard_id=shard.id))
+
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
@@ -1,4 +1,7 @@
+import io
 import os
+import re
+import asyncio
 import logging
 import discord
 
@@ -8,69 +11,198 @@ from discord.ext import commands
 
 from bot import BotCore
 
-from typing import Optional, List
+from typing import Optional, Dict, List, Tuple
 
 from utils.translator import Translator, TranslatorCallable
 from utils.embed import Embed
-from utils.types import WeatherData, WeatherAlert
-from utils.views import EmbedPaginator
+from utils.types import WeatherData
+from utils.views import PageButton, paginator_view
+from utils.renderer import (
+    render_current,
+    render_forecast,
+    render_compare,
+    render_hourly_page,
+    render_alert,
+    get_hourly_pages,
+    get_templates,
+    EMBED_COLOR
+)
+from utils.weather_client import WeatherAPIError
+from utils.errors import WeatherUnavailable
+from utils.cities import city_autocomplete
+from utils.preferences import USER_SCOPE, GUILD_SCOPE
+from utils.digests import DigestSubscriptions, DigestScheduler
+from utils.metrics import EMBED_BUILD_SECONDS, COMMAND_FOLLOWUP_SECONDS
 
 
 log = logging.getLogger(__name__)
 
-WEATHER_API_BASE_URL = 'https://api.weatherapi.com/v1'
+DIGEST_DELIVERY_CONCURRENCY = int(os.getenv('DIGEST_DELIVERY_CONCURRENCY', 5))
+MAX_DIGESTS_PER_CHANNEL = 5
+
+
+class ShowAlertsButton(
+    ui.DynamicItem[ui.Button],
+    template=r'weather:alerts:(?P<location>-?[\d.]+,-?[\d.]+)'
+):
+    def __init__(self, location: str, label: Optional[str] = None) -> None:
+        super().__init__(
+            ui.Button(
+                emoji='⚠',
+                style=ButtonStyle.blurple,
+                label=label,
+                custom_id=f'weather:alerts:{location}'
+            )
+        )
+        self.location: str = location
 
+    @classmethod
+    async def from_custom_id(
+        cls,
+        interaction: discord.Interaction,
+        item: ui.Button,
+        match: re.Match[str]
+    ) -> 'ShowAlertsButton':
+        return cls(match['location'])
 
-class ShowAlertsButton(ui.View):
-    def __init__(
-        self,
-        t: TranslatorCallable,
-        alerts: List[WeatherAlert],
-        *,
-        timeout: Optional[float] = 180
-    ):
-        super().__init__(timeout=timeout)
+    async def callback(self, interaction: discord.Interaction) -> None:
+        # Opens the alerts paginator for whoever clicked
+        page = PageButton('alerts', self.location, 0, interaction.user.id, 'c')
+        await page.callback(interaction)
 
-        self.alerts: List[WeatherAlert] = alerts
 
-        self.show_alert.label = t('commands.weather.show_alert')
+class Weather(commands.Cog):
+    def __init__(self, bot: BotCore) -> None:
+        self.bot: BotCore = bot
+        self.digests: DigestSubscriptions = DigestSubscriptions(
+            os.path.join(bot.data_dir, 'digest_subscriptions.json')
+        )
+        self.digest_scheduler: DigestScheduler = DigestScheduler(
+            self.digests, self._deliver_digest
+        )
+        # Shared by every delivery, so digests due at the same time don't
+        # flood the Discord API at once.
+        self._digest_semaphore: asyncio.Semaphore = asyncio.Semaphore(DIGEST_DELIVERY_CONCURRENCY)
+        self._digest_task: Optional[asyncio.Task] = None
+
+    async def cog_load(self) -> None:
+        PageButton.handlers['alerts'] = self._alerts_page
+        PageButton.handlers['hourly'] = self._hourly_page
+        self.bot.add_dynamic_items(ShowAlertsButton, PageButton)
+
+        await asyncio.to_thread(self.digests.load)
+        self.digest_scheduler.schedule_all()
+        self._digest_task = asyncio.create_task(self.digest_scheduler.run())
+
+    async def cog_unload(self) -> None:
+        PageButton.handlers.pop('alerts', None)
+        PageButton.handlers.pop('hourly', None)
+        self.bot.remove_dynamic_items(ShowAlertsButton, PageButton)
+
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+        self.digest_scheduler.cancel()
+
+    async def _alerts_page(
+        self,
+        interaction: discord.Interaction,
+        location: str,
+        index: int
+    ) -> Tuple[discord.Embed, int, int]:
+        t = Translator(interaction.locale)
+        data = await self.bot.weather.forecast(location, 1)
+        if not data.alerts:
+            return Embed.error(t('commands.weather.alert_expired')), 0, 1
 
-    @ui.button(emoji='⚠', style=ButtonStyle.blurple)
-    async def show_alert(self, interaction: discord.Interaction, button: ui.Button) -> None:
-        embeds = []
-        for alert in self.alerts:
-            embed = discord.Embed(
-                title=alert.headline,
-                description=alert.desc,
-                color=discord.Colour.brand_red()
-            )
-            embeds.append(embed)
+        index = min(index, len(data.alerts) - 1)
+        return render_alert(data.alerts[index]), index, len(data.alerts)
 
-        if len(embeds) == 1:
-            await interaction.response.edit_message(embed=embeds[0], view=None)
-        else:
-            view = EmbedPaginator(embeds, check=lambda i: i.user == interaction.user)
-            await interaction.response.edit_message(embed=embeds[0], view=view)
+    async def _hourly_page(
+        self,
+        interaction: discord.Interaction,
+        location: str,
+        index: int
+    ) -> Tuple[discord.Embed, int, int]:
+        t = Translator(interaction.locale)
+        data = await self.bot.weather.forecast(location, 3)
+        pages = get_hourly_pages(data)
 
-        self.stop()
+        index = min(index, len(pages) - 1)
+        return render_hourly_page(t, data, pages[index]), index, len(pages)
 
+    async def _get_city(
+        self,
+        interaction: discord.Interaction,
+        t: TranslatorCallable,
+        city: Optional[str]
+    ) -> Optional[str]:
+        # Falls back to the saved default location when the city is omitted
+        if city:
+            return city
+
+        saved = await self.bot.preferences.resolve(interaction.user.id, interaction.guild_id)
+        if saved is None:
+            embed = Embed.error(t('commands.weather.default.not_set'))
+            await interaction.followup.send(embed=embed)
+            return None
+        return saved[0]
 
-class Weather(commands.Cog):
-    def __init__(self, bot: BotCore) -> None:
-        self.bot: BotCore = bot
+    async def _send_digest(
+        self,
+        channel_id: int,
+        content: str,
+        embeds: List[discord.Embed]
+    ) -> bool:
+        # Returns whether the channel is gone and its digests were removed
+        async with self._digest_semaphore:
+            try:
+                channel = (
+                    self.bot.get_channel(channel_id) or
+                    await self.bot.fetch_channel(channel_id)
+                )
+                await channel.send(content, embeds=embeds)  # type: ignore
+            except (discord.NotFound, discord.Forbidden):
+                log.info(f'Removing digests of unavailable channel {channel_id}')
+                self.digests.remove_channel(channel_id)
+                return True
+            except discord.HTTPException as e:
+                log.warning(f'Failed to send digest to channel {channel_id}', exc_info=e)
+        return False
+
+    async def _deliver_digest(self, location: str, hour: int) -> None:
+        channels = dict(self.digests.buckets.get((location, hour), {}))
+        if not channels:
+            return
+
+        # Fetched once for every channel of the bucket
+        try:
+            data = await self.bot.weather.forecast(location, 3)
+        except Exception as e:
+            log.warning(f'Failed to fetch the digest of {location}', exc_info=e)
+            return
+
+        name = f'{data.location.name}, {data.location.country}'
+        rendered: Dict[str, Tuple[str, List[discord.Embed]]] = {}
+        for locale in set(channels.values()):
+            t = Translator(locale)
+            rendered[locale] = (
+                t('commands.weather.digest.message', location=name),
+                render_forecast(t, data)
+            )
 
-    def _classify_uv_index(self, t: TranslatorCallable, uv_index: int) -> str:
-        match uv_index:
-            case 0 | 1 | 2 | 3:
-                return t('commands.weather.uv_index_rating.low')
-            case 4 | 5 | 6:
-                return t('commands.weather.uv_index_rating.moderate')
-            case 7 | 8:
-                return t('commands.weather.uv_index_rating.high')
-            case 9 | 10 | 11:
-                return t('commands.weather.uv_index_rating.very_high')
-            case _:
-                return t('commands.weather.uv_index_rating.extreme')
+        removed = await asyncio.gather(*(
+            self._send_digest(channel_id, *rendered[locale])
+            for channel_id, locale in channels.items()
+        ))
+        if any(removed):
+            await self.digests.save()
+
+    def _alerts_view(self, t: TranslatorCallable, data: WeatherData) -> ui.View:
+        view = ui.View(timeout=None)
+        view.add_item(
+            ShowAlertsButton(data.location.coordinates, t('commands.weather.show_alert'))
+        )
+        return view
 
     weather = app_commands.Group(
         name=_T('weather', id='commands.weather.name'),
@@ -88,196 +220,517 @@ class Weather(commands.Cog):
     @app_commands.describe(
         city=_T('...', id='commands.weather.current.options.city.description')
     )
+    @app_commands.autocomplete(city=city_autocomplete)
     @app_commands.checks.cooldown(1, 5)
-    async def weather_current(self, interaction: discord.Interaction, city: str):
+    async def weather_current(self, interaction: discord.Interaction, city: Optional[str] = None):
         t = Translator(interaction.locale)
         await interaction.response.defer()
-        url = (
-            f'{WEATHER_API_BASE_URL}/forecast.json?' +
-            f'key={os.environ.get("WEATHER_API_KEY")}&' +
-            f'q={city}&days=1&alerts=yes'
-        )
+        with COMMAND_FOLLOWUP_SECONDS.time(command='current'):
+            city = await self._get_city(interaction, t, city)
+            if city is None:
+                return
+
+            try:
+                data = await self.bot.weather.forecast(city, 1)
+            except WeatherAPIError as e:
+                return await interaction.followup.send(embed=Embed.api_error(t, e.code))
+            except WeatherUnavailable as e:
+                return await interaction.followup.send(embed=Embed.error(t(e.translation_id)))
+            except Exception as e:
+                log.error('Request error', exc_info=e)
+                embed = Embed.error(t('errors.request_error'))
+                return await interaction.followup.send(embed=embed)
 
-        try:
-            async with self.bot.session.request('GET', url) as res:
-                data = await res.json()
-        except Exception as e:
-            log.error('Request error', exc_info=e)
-            embed = Embed.error(t('errors.request_error'))
-            return await interaction.followup.send(embed=embed)
+            with EMBED_BUILD_SECONDS.time(command='current'):
+                embed = render_current(t, data)
 
-        if res.status != 200:
-            #  City not found
-            if data['error']['code'] == 1006:
-                embed = Embed.error(t('errors.city_not_found'))
-            else:
-                embed = Embed.error(t('errors.request_error'))
-                embed.set_footer(
-                    text=t(
-                        'errors.error_code', error_code=data['error']['code']
-                    )
+            if len(data.alerts) > 0:
+                alert_embed = discord.Embed(
+                    description=t('commands.weather.alert_available'),
+                    color=discord.Colour.brand_red()
                 )
-            return await interaction.followup.send(embed=embed)
 
-        data = WeatherData(data)
+                embeds = [alert_embed, embed]
 
-        day_or_night = 'day' if data.current.is_day else 'night'
-        condition_text = t(f'commands.weather.codes.{data.current.condition_code}.{day_or_night}')
+                view = self._alerts_view(t, data)
 
-        embed = discord.Embed(
-            title=f'{data.location.name}, {data.location.country}',
-            description=condition_text,
-            color=0x5ea3d8,
-            timestamp=data.current.last_updated
-        )
+                await interaction.followup.send(embeds=embeds, view=view)
+            else:
+                await interaction.followup.send(embed=embed)
 
-        embed.add_field(
-            name='🌡 ' + t('commands.weather.temperature'),
-            value=f'{data.current.temp_c}° C | {data.current.temp_f}° F',
-            inline=False
-        )
+    @weather.command(
+        name=_T('forecast', id='commands.weather.forecast.name'),
+        description=_T('...', id='commands.weather.forecast.description')
+    )
+    @app_commands.rename(
+        city=_T('city', id='commands.weather.forecast.options.city.name')
+    )
+    @app_commands.describe(
+        city=_T('...', id='commands.weather.forecast.options.city.description')
+    )
+    @app_commands.autocomplete(city=city_autocomplete)
+    @app_commands.checks.cooldown(1, 5)
+    async def weather_forecast(self, interaction: discord.Interaction, city: Optional[str] = None):
+        t = Translator(interaction.locale)
+        await interaction.response.defer()
+        with COMMAND_FOLLOWUP_SECONDS.time(command='forecast'):
+            city = await self._get_city(interaction, t, city)
+            if city is None:
+                return
+
+            try:
+                data = await self.bot.weather.forecast(city, 3)
+            except WeatherAPIError as e:
+                return await interaction.followup.send(embed=Embed.api_error(t, e.code))
+            except WeatherUnavailable as e:
+                return await interaction.followup.send(embed=Embed.error(t(e.translation_id)))
+            except Exception as e:
+                log.error('Request error', exc_info=e)
+                embed = Embed.error(t('errors.request_error'))
+                return await interaction.followup.send(embed=embed)
 
-        embed.add_field(
-            name='💧 ' + t('commands.weather.humidity'),
-            value=f'{data.current.humidity}%',
-            inline=False
-        )
+            with EMBED_BUILD_SECONDS.time(command='forecast'):
+                embeds = render_forecast(t, data)
 
-        embed.add_field(
-            name='💨 ' + t('commands.weather.wind_speed'),
-            value=f'{data.current.wind_kph} km/h',
-            inline=False
-        )
+            if len(data.alerts) > 0:
+                alert_embed = discord.Embed(
+                    description=t('commands.weather.alert_available'),
+                    color=discord.Colour.brand_red()
+                )
+                embeds.insert(0, alert_embed)
 
-        embed.add_field(
-            name='☀ ' + t('commands.weather.uv_index'),
-            value=f'{self._classify_uv_index(t, int(data.current.uv))}',
-            inline=False
-        )
+                view = self._alerts_view(t, data)
 
-        embed.set_footer(
-            text='https://www.weatherapi.com/' + ' | ' + t('commands.weather.last_updated')
-        )
+                await interaction.followup.send(embeds=embeds, view=view)
+            else:
+                await interaction.followup.send(embeds=embeds)
 
-        embed.set_thumbnail(url='https:' + data.current.condition_icon)
+    @weather.command(
+        name=_T('hourly', id='commands.weather.hourly.name'),
+        description=_T('...', id='commands.weather.hourly.description')
+    )
+    @app_commands.rename(
+        city=_T('city', id='commands.weather.hourly.options.city.name')
+    )
+    @app_commands.describe(
+        city=_T('...', id='commands.weather.hourly.options.city.description')
+    )
+    @app_commands.autocomplete(city=city_autocomplete)
+    @app_commands.checks.cooldown(1, 5)
+    async def weather_hourly(self, interaction: discord.Interaction, city: Optional[str] = None):
+        t = Translator(interaction.locale)
+        await interaction.response.defer()
+        with COMMAND_FOLLOWUP_SECONDS.time(command='hourly'):
+            city = await self._get_city(interaction, t, city)
+            if city is None:
+                return
+
+            try:
+                data = await self.bot.weather.forecast(city, 3)
+            except WeatherAPIError as e:
+                return await interaction.followup.send(embed=Embed.api_error(t, e.code))
+            except WeatherUnavailable as e:
+                return await interaction.followup.send(embed=Embed.error(t(e.translation_id)))
+            except Exception as e:
+                log.error('Request error', exc_info=e)
+                embed = Embed.error(t('errors.request_error'))
+                return await interaction.followup.send(embed=embed)
+
+            # Only the first page is rendered now, the others when they're shown
+            with EMBED_BUILD_SECONDS.time(command='hourly'):
+                pages = get_hourly_pages(data)
+                embed = render_hourly_page(t, data, pages[0])
 
-        if len(data.alerts) > 0:
-            alert_embed = discord.Embed(
-                description=t('commands.weather.alert_available'),
-                color=discord.Colour.brand_red()
+            view = paginator_view(
+                'hourly', data.location.coordinates, 0, len(pages), interaction.user.id
             )
+            if view is not None:
+                await interaction.followup.send(embed=embed, view=view)
+            else:
+                await interaction.followup.send(embed=embed)
 
-            embeds = [alert_embed, embed]
+    @weather.command(
+        name=_T('card', id='commands.weather.card.name'),
+        description=_T('...', id='commands.weather.card.description')
+    )
+    @app_commands.rename(
+        city=_T('city', id='commands.weather.card.options.city.name'),
+        units=_T('units', id='commands.weather.card.options.units.name')
+    )
+    @app_commands.describe(
+        city=_T('...', id='commands.weather.card.options.city.description'),
+        units=_T('...', id='commands.weather.card.options.units.description')
+    )
+    @app_commands.choices(units=[
+        app_commands.Choice(name=_T('Celsius', id='commands.weather.card.units.metric'),
+                            value='metric'),
+        app_commands.Choice(name=_T('Fahrenheit', id='commands.weather.card.units.imperial'),
+                            value='imperial')
+    ])
+    @app_commands.autocomplete(city=city_autocomplete)
+    @app_commands.checks.cooldown(1, 5)
+    async def weather_card(
+        self,
+        interaction: discord.Interaction,
+        city: Optional[str] = None,
+        units: str = 'metric'
+    ):
+        t = Translator(interaction.locale)
 
-            view = ShowAlertsButton(t, data.alerts)
+        if self.bot.cards is None:
+            embed = Embed.error(t('commands.weather.card.unavailable'))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            await interaction.followup.send(embeds=embeds, view=view)
-        else:
-            await interaction.followup.send(embed=embed)
+        await interaction.response.defer()
+        with COMMAND_FOLLOWUP_SECONDS.time(command='card'):
+            city = await self._get_city(interaction, t, city)
+            if city is None:
+                return
+
+            try:
+                data = await self.bot.weather.forecast(city, 3)
+            except WeatherAPIError as e:
+                return await interaction.followup.send(embed=Embed.api_error(t, e.code))
+            except WeatherUnavailable as e:
+                return await interaction.followup.send(embed=Embed.error(t(e.translation_id)))
+            except Exception as e:
+                log.error('Request error', exc_info=e)
+                embed = Embed.error(t('errors.request_error'))
+                return await interaction.followup.send(embed=embed)
+
+            try:
+                image = await self.bot.cards.render(t, data, units)
+            except Exception as e:
+                log.error('Failed to render weather card', exc_info=e)
+                embed = Embed.error(t('errors.request_error'))
+                return await interaction.followup.send(embed=embed)
+
+            templates = get_templates(t)
+            embed = discord.Embed(color=EMBED_COLOR, timestamp=data.current.last_updated)
+            embed.set_image(url='attachment://weather.png')
+            embed.set_footer(text=templates.outdated_footer if data.stale else templates.footer)
+
+            file = discord.File(io.BytesIO(image), filename='weather.png')
+            await interaction.followup.send(embed=embed, file=file)
 
     @weather.command(
-        name=_T('forecast', id='commands.weather.forecast.name'),
-        description=_T('...', id='commands.weather.forecast.description')
+        name=_T('compare', id='commands.weather.compare.name'),
+        description=_T('...', id='commands.weather.compare.description')
     )
     @app_commands.rename(
-        city=_T('city', id='commands.weather.forecast.options.city.name')
+        city1=_T('city1', id='commands.weather.compare.options.city1.name'),
+        city2=_T('city2', id='commands.weather.compare.options.city2.name'),
+        city3=_T('city3', id='commands.weather.compare.options.city3.name'),
+        city4=_T('city4', id='commands.weather.compare.options.city4.name'),
+        city5=_T('city5', id='commands.weather.compare.options.city5.name')
     )
     @app_commands.describe(
-        city=_T('...', id='commands.weather.forecast.options.city.description')
+        city1=_T('...', id='commands.weather.compare.options.city1.description'),
+        city2=_T('...', id='commands.weather.compare.options.city2.description'),
+        city3=_T('...', id='commands.weather.compare.options.city3.description'),
+        city4=_T('...', id='commands.weather.compare.options.city4.description'),
+        city5=_T('...', id='commands.weather.compare.options.city5.description')
+    )
+    @app_commands.autocomplete(
+        city1=city_autocomplete,
+        city2=city_autocomplete,
+        city3=city_autocomplete,
+        city4=city_autocomplete,
+        city5=city_autocomplete
     )
     @app_commands.checks.cooldown(1, 5)
-    async def weather_forecast(self, interaction: discord.Interaction, city: str):
+    async def weather_compare(
+        self,
+        interaction: discord.Interaction,
+        city1: str,
+        city2: str,
+        city3: Optional[str] = None,
+        city4: Optional[str] = None,
+        city5: Optional[str] = None
+    ):
         t = Translator(interaction.locale)
         await interaction.response.defer()
-        url = (
-            f'{WEATHER_API_BASE_URL}/forecast.json?' +
-            f'key={os.environ.get("WEATHER_API_KEY")}&' +
-            f'q={city}&days=3&alerts=yes'
+        with COMMAND_FOLLOWUP_SECONDS.time(command='compare'):
+            cities = [city for city in (city1, city2, city3, city4, city5) if city]
+
+            try:
+                results = await self.bot.weather.current_many(cities)
+            except WeatherUnavailable as e:
+                return await interaction.followup.send(embed=Embed.error(t(e.translation_id)))
+            except Exception as e:
+                log.error('Request error', exc_info=e)
+                embed = Embed.error(t('errors.request_error'))
+                return await interaction.followup.send(embed=embed)
+
+            with EMBED_BUILD_SECONDS.time(command='compare'):
+                embed = render_compare(t, cities, results)
+
+            await interaction.followup.send(embed=embed)
+
+    default = app_commands.Group(
+        name=_T('default', id='commands.weather.default.name'),
+        description=_T('...', id='commands.weather.default.description'),
+        parent=weather
+    )
+
+    def _check_scope(self, interaction: discord.Interaction, scope: str) -> Optional[str]:
+        # Returns the translation id of the error, if any
+        if scope != GUILD_SCOPE:
+            return None
+        if interaction.guild_id is None:
+            return 'commands.weather.default.guild_only'
+        if not interaction.permissions.manage_guild:
+            return 'commands.weather.default.missing_permissions'
+        return None
+
+    def _scope_id(self, interaction: discord.Interaction, scope: str) -> int:
+        if scope == GUILD_SCOPE:
+            assert interaction.guild_id is not None
+            return interaction.guild_id
+        return interaction.user.id
+
+    @default.command(
+        name=_T('set', id='commands.weather.default.set.name'),
+        description=_T('...', id='commands.weather.default.set.description')
+    )
+    @app_commands.rename(
+        city=_T('city', id='commands.weather.default.set.options.city.name'),
+        scope=_T('scope', id='commands.weather.default.options.scope.name')
+    )
+    @app_commands.describe(
+        city=_T('...', id='commands.weather.default.set.options.city.description'),
+        scope=_T('...', id='commands.weather.default.options.scope.description')
+    )
+    @app_commands.choices(scope=[
+        app_commands.Choice(name=_T('Me', id='commands.weather.default.scope.user'),
+                            value=USER_SCOPE),
+        app_commands.Choice(name=_T('Server', id='commands.weather.default.scope.guild'),
+                            value=GUILD_SCOPE)
+    ])
+    @app_commands.autocomplete(city=city_autocomplete)
+    @app_commands.checks.cooldown(1, 5)
+    async def default_set(
+        self,
+        interaction: discord.Interaction,
+        city: str,
+        scope: str = USER_SCOPE
+    ):
+        t = Translator(interaction.locale)
+
+        error = self._check_scope(interaction, scope)
+        if error is not None:
+            embed = Embed.error(t(error))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            data = await self.bot.weather.forecast(city, 1)
+        except WeatherAPIError as e:
+            return await interaction.followup.send(embed=Embed.api_error(t, e.code))
+        except WeatherUnavailable as e:
+            return await interaction.followup.send(embed=Embed.error(t(e.translation_id)))
+        except Exception as e:
+            log.error('Request error', exc_info=e)
+            embed = Embed.error(t('errors.request_error'))
+            return await interaction.followup.send(embed=embed)
+
+        # Saved by coordinates, the canonical key of the weather cache
+        name = f'{data.location.name}, {data.location.country}'
+        self.bot.preferences.set(
+            scope, self._scope_id(interaction, scope), data.location.coordinates, name
         )
-        discord.Locale
+
+        embed = Embed.success(t(f'commands.weather.default.saved_{scope}', location=name))
+        await interaction.followup.send(embed=embed)
+
+    @default.command(
+        name=_T('clear', id='commands.weather.default.clear.name'),
+        description=_T('...', id='commands.weather.default.clear.description')
+    )
+    @app_commands.rename(
+        scope=_T('scope', id='commands.weather.default.options.scope.name')
+    )
+    @app_commands.describe(
+        scope=_T('...', id='commands.weather.default.options.scope.description')
+    )
+    @app_commands.choices(scope=[
+        app_commands.Choice(name=_T('Me', id='commands.weather.default.scope.user'),
+                            value=USER_SCOPE),
+        app_commands.Choice(name=_T('Server', id='commands.weather.default.scope.guild'),
+                            value=GUILD_SCOPE)
+    ])
+    async def default_clear(self, interaction: discord.Interaction, scope: str = USER_SCOPE):
+        t = Translator(interaction.locale)
+
+        error = self._check_scope(interaction, scope)
+        if error is not None:
+            embed = Embed.error(t(error))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        scope_id = self._scope_id(interaction, scope)
+        if await self.bot.preferences.get(scope, scope_id) is None:
+            embed = Embed.error(t('commands.weather.default.not_set'))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        self.bot.preferences.delete(scope, scope_id)
+        embed = Embed.success(t('commands.weather.default.cleared'))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    digest = app_commands.Group(
+        name=_T('digest', id='commands.weather.digest.name'),
+        description=_T('...', id='commands.weather.digest.description'),
+        parent=weather
+    )
+
+    def _check_digest_permissions(self, interaction: discord.Interaction) -> Optional[str]:
+        # Returns the translation id of the error, if any
+        if interaction.guild_id is None:
+            return 'commands.weather.digest.guild_only'
+        if not interaction.permissions.manage_channels:
+            return 'commands.weather.digest.missing_permissions'
+        return None
+
+    @digest.command(
+        name=_T('subscribe', id='commands.weather.digest.subscribe.name'),
+        description=_T('...', id='commands.weather.digest.subscribe.description')
+    )
+    @app_commands.rename(
+        city=_T('city', id='commands.weather.digest.subscribe.options.city.name'),
+        hour=_T('hour', id='commands.weather.digest.subscribe.options.hour.name')
+    )
+    @app_commands.describe(
+        city=_T('...', id='commands.weather.digest.subscribe.options.city.description'),
+        hour=_T('...', id='commands.weather.digest.subscribe.options.hour.description')
+    )
+    @app_commands.autocomplete(city=city_autocomplete)
+    @app_commands.checks.cooldown(1, 5)
+    async def digest_subscribe(
+        self,
+        interaction: discord.Interaction,
+        city: str,
+        hour: app_commands.Range[int, 0, 23] = 8
+    ):
+        t = Translator(interaction.locale)
+
+        error = self._check_digest_permissions(interaction)
+        if error is not None:
+            embed = Embed.error(t(error))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        channel_id = interaction.channel_id
+        assert channel_id is not None
+
+        if len(self.digests.get_channel_digests(channel_id)) >= MAX_DIGESTS_PER_CHANNEL:
+            embed = Embed.error(
+                t('commands.weather.digest.limit_reached', limit=MAX_DIGESTS_PER_CHANNEL)
+            )
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        await interaction.response.defer(ephemeral=True)
 
         try:
-            async with self.bot.session.request('GET', url) as res:
-                data = await res.json()
+            data = await self.bot.weather.forecast(city, 1)
+        except WeatherAPIError as e:
+            return await interaction.followup.send(embed=Embed.api_error(t, e.code))
+        except WeatherUnavailable as e:
+            return await interaction.followup.send(embed=Embed.error(t(e.translation_id)))
         except Exception as e:
             log.error('Request error', exc_info=e)
             embed = Embed.error(t('errors.request_error'))
             return await interaction.followup.send(embed=embed)
 
-        if res.status != 200:
-            #  City not found
-            if data['error']['code'] == 1006:
-                embed = Embed.error(t('errors.city_not_found'))
-            else:
-                embed = Embed.error(t('errors.request_error'))
-                embed.set_footer(
-                    text=t(
-                        'errors.error_code', error_code=data['error']['code']
-                    )
-                )
+        # The hour is local to the location, not to the user
+        location = data.location.coordinates
+        name = f'{data.location.name}, {data.location.country}'
+        locale = (interaction.guild_locale or interaction.locale).value
+
+        if not self.digests.subscribe(
+            channel_id, location, name, data.location.tz_id, hour, locale
+        ):
+            embed = Embed.error(t(
+                'commands.weather.digest.already_subscribed',
+                location=name,
+                time=f'{hour:02d}:00'
+            ))
             return await interaction.followup.send(embed=embed)
 
-        data = WeatherData(data)
+        await self.digests.save()
+        self.digest_scheduler.schedule(location, hour)
 
-        day_or_night = 'day' if data.current.is_day else 'night'
+        embed = Embed.success(
+            t('commands.weather.digest.subscribed', location=name, time=f'{hour:02d}:00')
+        )
+        await interaction.followup.send(embed=embed)
 
-        embeds = []
-        for i, day in enumerate(data.forecast, 1):
-            condition_text = t(f'commands.weather.codes.{day.condition_code}.{day_or_night}')
+    @digest.command(
+        name=_T('unsubscribe', id='commands.weather.digest.unsubscribe.name'),
+        description=_T('...', id='commands.weather.digest.unsubscribe.description')
+    )
+    @app_commands.rename(
+        digest=_T('digest', id='commands.weather.digest.unsubscribe.options.digest.name')
+    )
+    @app_commands.describe(
+        digest=_T('...', id='commands.weather.digest.unsubscribe.options.digest.description')
+    )
+    async def digest_unsubscribe(self, interaction: discord.Interaction, digest: str):
+        t = Translator(interaction.locale)
 
-            embed = discord.Embed(
-                title=discord.utils.format_dt(day.date, 'd'),
-                description=condition_text,
-                color=0x5ea3d8
-            )
+        error = self._check_digest_permissions(interaction)
+        if error is not None:
+            embed = Embed.error(t(error))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            if i == 1:
-                embed.set_author(
-                    name=f'{data.location.name}, {data.location.country}'
-                )
+        channel_id = interaction.channel_id
+        assert channel_id is not None
 
-            embed.add_field(
-                name='🌡 ' + t('commands.weather.temperature'),
-                value=(
-                    f'🔼 {day.maxtemp_c}° C | {day.maxtemp_f}° F\n'
-                    f'🔽 {day.mintemp_c}° C | {day.mintemp_f}° F'
-                )
-            )
-            if day.daily_chance_of_rain > 0:
-                embed.add_field(
-                    name='🌧 ' + t('commands.weather.chance_of_rain'),
-                    value=f'{day.daily_chance_of_rain}%'
-                )
-            if day.daily_chance_of_snow > 0:
-                embed.add_field(
-                    name='❄ ' + t('commands.weather.chance_of_snow'),
-                    value=f'{day.daily_chance_of_snow}%'
-                )
-            embed.set_thumbnail(url='https:' + data.current.condition_icon)
-
-            if i == len(data.forecast):
-                embed.set_footer(
-                    text=(
-                        'https://www.weatherapi.com/' + ' | ' +
-                        t('commands.weather.last_updated')
-                    )
-                )
-                embed.timestamp = data.current.last_updated
+        # Autocomplete values look like "lat,lon@hour"
+        location, _, hour = digest.rpartition('@')
+        if not hour.isdigit() or \
+                not self.digests.unsubscribe(channel_id, location, int(hour)):
+            embed = Embed.error(t('commands.weather.digest.not_subscribed'))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            embeds.append(embed)
+        await self.digests.save()
+        embed = Embed.success(t('commands.weather.digest.unsubscribed'))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        if len(data.alerts) > 0:
-            alert_embed = discord.Embed(
-                description=t('commands.weather.alert_available'),
-                color=discord.Colour.brand_red()
-            )
-            embeds.insert(0, alert_embed)
+    @digest_unsubscribe.autocomplete('digest')
+    async def digest_unsubscribe_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[str]]:
+        assert interaction.channel_id is not None
+        current = current.casefold()
+        return [
+            app_commands.Choice(name=f'{name} ({hour:02d}:00)', value=f'{location}@{hour}')
+            for location, hour, name in self.digests.get_channel_digests(interaction.channel_id)
+            if current in name.casefold()
+        ][:25]
+
+    @digest.command(
+        name=_T('list', id='commands.weather.digest.list.name'),
+        description=_T('...', id='commands.weather.digest.list.description')
+    )
+    async def digest_list(self, interaction: discord.Interaction):
+        t = Translator(interaction.locale)
 
-            view = ShowAlertsButton(t, data.alerts)
+        assert interaction.channel_id is not None
+        digests = self.digests.get_channel_digests(interaction.channel_id)
+        if not digests:
+            embed = Embed.error(t('commands.weather.digest.list_empty'))
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            await interaction.followup.send(embeds=embeds, view=view)
-        else:
-            await interaction.followup.send(embeds=embeds)
+        embed = discord.Embed(
+            title='🗓 ' + t('commands.weather.digest.list_title'),
+            description='\n'.join(
+                f'• {name} — {hour:02d}:00'
+                for _, hour, name in sorted(digests, key=lambda x: (x[2], x[1]))
+            ),
+            color=EMBED_COLOR
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
 async def setup(bot: BotCore) -> None:
@@ -1,8 +1,9 @@
 import os
 import asyncio
+import argparse
 import discord
 
-from bot import BotCore
+from bot import BotCore, ShardedBotCore
 
 from dotenv import load_dotenv
 
@@ -11,14 +12,58 @@ load_dotenv()
 
 discord.utils.setup_logging()
 
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '--sync',
+    action='store_true',
+    help='Sync application commands even if they have not changed'
+)
+parser.add_argument(
+    '--sharded',
+    action='store_true',
+    default=bool(os.getenv('SHARD_COUNT') or os.getenv('SHARD_IDS')),
+    help='Run with multiple gateway shards'
+)
+parser.add_argument(
+    '--shard-count',
+    type=int,
+    default=os.getenv('SHARD_COUNT') or None,
+    help='Total number of shards (defaults to the number recommended by Discord)'
+)
+parser.add_argument(
+    '--shard-ids',
+    type=lambda value: [int(i) for i in value.split(',')],
+    default=os.getenv('SHARD_IDS') or None,
+    help='Comma separated shard IDs to run in this process (requires --shard-count)'
+)
+
+
+def create_bot() -> BotCore:
+    if args.sharded or args.shard_count or args.shard_ids:
+        return ShardedBotCore(
+            test_guild_id=os.getenv('TEST_GUILD_ID'),
+            force_sync=args.sync,
+            shard_count=args.shard_count,
+            shard_ids=args.shard_ids
+        )
+    return BotCore(
+        test_guild_id=os.getenv('TEST_GUILD_ID'),
+        force_sync=args.sync
+    )
+
 
 async def main():
-    async with BotCore(
-        test_guild_id=os.getenv('TEST_GUILD_ID')
-    ) as bot:
+    async with create_bot() as bot:
         await bot.start(os.getenv('DISCORD_BOT_TOKEN'))
 
-try:
-    asyncio.run(main())
-except KeyboardInterrupt:
-    pass
+
+# Card render workers import this module again, they must not start a bot
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.shard_ids and not args.shard_count:
+        parser.error('--shard-ids requires --shard-count')
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
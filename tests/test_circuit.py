@@ -0,0 +1,111 @@
+import unittest
+
+from benchmarks.fakes import FixtureServer
+from utils.circuit import CircuitBreaker, CircuitOpen, CircuitState
+from utils.ratelimit import RateLimitExceeded
+from utils.weather_client import WeatherClient, WeatherAPIError
+
+
+TEST_PORT = 8766
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def trip(self, breaker: CircuitBreaker) -> None:
+        with self.assertRaises(ConnectionError):
+            with breaker.guard():
+                raise ConnectionError()
+
+    def test_opens_after_threshold(self) -> None:
+        breaker = CircuitBreaker(2, recovery_timeout=60)
+        self.trip(breaker)
+        self.assertIs(breaker.state, CircuitState.CLOSED)
+        self.trip(breaker)
+        self.assertIs(breaker.state, CircuitState.OPEN)
+
+        with self.assertRaises(CircuitOpen):
+            with breaker.guard():
+                pass
+
+    def test_half_open_single_probe(self) -> None:
+        breaker = CircuitBreaker(1, recovery_timeout=0)
+        self.trip(breaker)
+
+        with breaker.guard():
+            self.assertIs(breaker.state, CircuitState.HALF_OPEN)
+            # Other requests fail fast while the probe is in flight
+            with self.assertRaises(CircuitOpen):
+                with breaker.guard():
+                    pass
+        self.assertIs(breaker.state, CircuitState.CLOSED)
+        self.assertEqual(breaker.failures, 0)
+
+    def test_failed_probe_reopens(self) -> None:
+        breaker = CircuitBreaker(5, recovery_timeout=0)
+        breaker.state = CircuitState.OPEN
+
+        self.trip(breaker)
+        self.assertIs(breaker.state, CircuitState.OPEN)
+
+    def test_local_refusals_not_counted(self) -> None:
+        breaker = CircuitBreaker(1, recovery_timeout=0)
+        with self.assertRaises(RateLimitExceeded):
+            with breaker.guard():
+                raise RateLimitExceeded(1)
+        self.assertIs(breaker.state, CircuitState.CLOSED)
+        self.assertEqual(breaker.failures, 0)
+
+        # A refused probe lets the next request probe instead
+        self.trip(breaker)
+        with self.assertRaises(RateLimitExceeded):
+            with breaker.guard():
+                raise RateLimitExceeded(1)
+        with breaker.guard():
+            pass
+        self.assertIs(breaker.state, CircuitState.CLOSED)
+
+
+class ClientCircuitTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = FixtureServer(port=TEST_PORT, latency=0)
+        await self.server.start()
+        self.client = WeatherClient(
+            'test',
+            base_url=self.server.base_url,
+            circuit=CircuitBreaker(2, recovery_timeout=60)
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.server.close()
+
+    async def test_server_errors_open_the_circuit(self) -> None:
+        self.server.status = 502
+        for _ in range(2):
+            with self.assertRaises(WeatherAPIError) as cm:
+                await self.client.forecast('Sao Paulo')
+            self.assertEqual(cm.exception.code, 502)
+
+        with self.assertRaises(CircuitOpen):
+            await self.client.forecast('Sao Paulo')
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_client_errors_not_counted(self) -> None:
+        self.server.status = 400
+        for _ in range(3):
+            with self.assertRaises(WeatherAPIError) as cm:
+                await self.client.forecast('nowhere')
+            self.assertEqual(cm.exception.code, 1006)
+
+        assert self.client.circuit is not None
+        self.assertIs(self.client.circuit.state, CircuitState.CLOSED)
+        self.assertEqual(self.server.requests, 3)
+
+    async def test_error_body_not_json(self) -> None:
+        # current.json has no fixture, so the server answers with a plain text 404
+        with self.assertRaises(WeatherAPIError) as cm:
+            await self.client._request('GET', 'current.json', q='Sao Paulo')
+        self.assertEqual(cm.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
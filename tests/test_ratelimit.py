@@ -0,0 +1,76 @@
+import os
+import time
+import tempfile
+import unittest
+
+from utils.ratelimit import TokenBucket, QuotaBudget, RateLimitExceeded, QuotaExceeded
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    async def test_waits_for_a_token(self) -> None:
+        bucket = TokenBucket(rate=10, capacity=1)
+        await bucket.acquire(0)
+
+        start = time.monotonic()
+        await bucket.acquire(1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    async def test_wait_is_bounded(self) -> None:
+        bucket = TokenBucket(rate=10, capacity=1)
+        await bucket.acquire(0)
+
+        with self.assertRaises(RateLimitExceeded) as cm:
+            await bucket.acquire(0.01)
+        self.assertGreater(cm.exception.retry_after, 0.01)
+
+        # A refused request doesn't reserve a token
+        self.assertGreater(bucket.tokens, -0.5)
+
+
+class QuotaBudgetTest(unittest.TestCase):
+    def test_limit(self) -> None:
+        quota = QuotaBudget(10, tight_ratio=0.5)
+        quota.consume(4)
+        self.assertFalse(quota.tight)
+        quota.consume()
+        self.assertTrue(quota.tight)
+
+        with self.assertRaises(QuotaExceeded):
+            quota.consume(6)
+        self.assertEqual(quota.remaining, 5)
+
+    def test_month_rollover(self) -> None:
+        quota = QuotaBudget(10)
+        quota.consume(10)
+        quota.month = '2000-01'
+
+        self.assertEqual(quota.remaining, 10)
+        quota.consume()
+        self.assertEqual(quota.used, 1)
+
+    def test_save_and_load(self) -> None:
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = os.path.join(data_dir, 'quota.json')
+            quota = QuotaBudget(10, path=path)
+            quota.consume(3)
+            self.assertTrue(quota.dirty)
+            quota.save()
+            self.assertFalse(quota.dirty)
+
+            loaded = QuotaBudget(10, path=path)
+            loaded.load()
+            self.assertEqual(loaded.used, 3)
+
+    def test_usage_from_another_month_ignored(self) -> None:
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = os.path.join(data_dir, 'quota.json')
+            with open(path, 'w') as f:
+                f.write('{"month": "2000-01", "used": 9}')
+
+            quota = QuotaBudget(10, path=path)
+            quota.load()
+            self.assertEqual(quota.used, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+
+from typing import Optional, List, Sequence
+
+from benchmarks.fakes import FixtureServer
+from utils.cache import MemoryBackend, WeatherCache, normalize_query
+from utils.weather_client import WeatherClient
+
+
+TEST_PORT = 8766
+
+
+class FailingBackend(MemoryBackend):
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        raise ConnectionError('Shared cache unavailable')
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise ConnectionError('Shared cache unavailable')
+
+
+# The fixture server answers every query with the same Sao Paulo forecast
+class SharedCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = FixtureServer(port=TEST_PORT, latency=0)
+        await self.server.start()
+        self.clients: List[WeatherClient] = []
+
+    async def asyncTearDown(self) -> None:
+        for client in self.clients:
+            await client.close()
+        await self.server.close()
+
+    def client(self, backend: MemoryBackend) -> WeatherClient:
+        # Every client gets its own local cache, like separate bot processes
+        client = WeatherClient(
+            'test',
+            base_url=self.server.base_url,
+            cache=WeatherCache(),
+            shared_cache=backend
+        )
+        self.clients.append(client)
+        return client
+
+    async def test_miss_writes_forecast_and_alias(self) -> None:
+        backend = MemoryBackend()
+        weather = await self.client(backend).forecast('Sao Paulo')
+
+        canonical = weather.location.coordinates
+        forecast, alias = await backend.get_many([
+            f'forecast:{normalize_query(canonical)}:1',
+            'alias:sao paulo'
+        ])
+        self.assertEqual(self.server.requests, 1)
+        self.assertIsNotNone(forecast)
+        self.assertIsNotNone(alias)
+        assert alias is not None
+        self.assertEqual(alias.decode('utf-8').partition('\n')[0], canonical)
+
+    async def test_hit_skips_upstream(self) -> None:
+        backend = MemoryBackend()
+        first = await self.client(backend).forecast('Sao Paulo')
+
+        other = self.client(backend)
+        second = await other.forecast('Sao Paulo')
+
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(second.location.coordinates, first.location.coordinates)
+        # The hit is kept in the local cache too
+        assert other.cache is not None
+        self.assertIsNotNone(other.cache.get(first.location.coordinates, 1))
+
+    async def test_hit_answers_fewer_days(self) -> None:
+        backend = MemoryBackend()
+        await self.client(backend).forecast('Sao Paulo', days=3)
+        await self.client(backend).forecast('Sao Paulo', days=1)
+
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_alias_shared_between_clients(self) -> None:
+        backend = MemoryBackend()
+        weather = await self.client(backend).forecast('Sao Paulo')
+
+        other = self.client(backend)
+        self.assertIsNone(other.locations.resolve('sao paulo'))
+        await other.forecast('  SAO PAULO ')
+
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(other.locations.resolve('sao paulo'), weather.location.coordinates)
+
+    async def test_backend_errors_fall_through(self) -> None:
+        client = self.client(FailingBackend())
+
+        with self.assertLogs('utils.weather_client', 'WARNING') as logs:
+            weather = await client.forecast('Sao Paulo')
+
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(weather.location.name, 'Sao Paulo')
+        self.assertTrue(any('lookup failed' in line for line in logs.output))
+        self.assertTrue(any('update failed' in line for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
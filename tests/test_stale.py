@@ -0,0 +1,71 @@
+import time
+import asyncio
+import unittest
+
+from benchmarks.fakes import FixtureServer
+from utils.cache import WeatherCache
+from utils.weather_client import WeatherClient, WeatherAPIError, MAX_STALE
+
+
+TEST_PORT = 8766
+
+
+class StaleDataTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = FixtureServer(port=TEST_PORT, latency=0)
+        await self.server.start()
+        self.cache = WeatherCache()
+        self.client = WeatherClient(
+            'test',
+            base_url=self.server.base_url,
+            cache=self.cache,
+            stale_while_revalidate=60
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.server.close()
+
+    async def expire(self, age: float) -> None:
+        # Caches the forecast and backdates it as if it expired age seconds ago
+        weather = await self.client.forecast('Sao Paulo')
+        entry = self.cache.peek(weather.location.coordinates, 1)
+        assert entry is not None
+        entry.expires_at = entry.data.expires_at = time.time() - age
+
+    async def test_recently_expired_served_while_refreshing(self) -> None:
+        await self.expire(10)
+
+        weather = await self.client.forecast('Sao Paulo')
+        self.assertTrue(weather.stale)
+
+        await asyncio.gather(*self.client._background)
+        self.assertEqual(self.server.requests, 2)
+        self.assertFalse((await self.client.forecast('Sao Paulo')).stale)
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_expired_refreshed_before_answering(self) -> None:
+        await self.expire(120)
+
+        weather = await self.client.forecast('Sao Paulo')
+        self.assertFalse(weather.stale)
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_expired_served_when_upstream_fails(self) -> None:
+        await self.expire(MAX_STALE - 60)
+        self.server.status = 502
+
+        weather = await self.client.forecast('Sao Paulo')
+        self.assertTrue(weather.stale)
+        self.assertEqual(self.server.requests, 2)
+
+    async def test_too_old_not_served(self) -> None:
+        await self.expire(MAX_STALE + 60)
+        self.server.status = 502
+
+        with self.assertRaises(WeatherAPIError):
+            await self.client.forecast('Sao Paulo')
+
+
+if __name__ == '__main__':
+    unittest.main()
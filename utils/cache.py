@@ -0,0 +1,226 @@
+import time
+import asyncio
+import unicodedata
+
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Hashable, Callable, Awaitable, TypeVar, List, Sequence
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+from utils.types import WeatherData
+from utils.metrics import Counter, WEATHER_CACHE_REQUESTS, WEATHERAPI_DEDUPLICATED
+
+
+T = TypeVar('T')
+
+# Largest number of forecast days requested by the bot.
+MAX_FORECAST_DAYS = 3
+
+# WeatherAPI refreshes realtime data every 15 minutes.
+DEFAULT_REFRESH_INTERVAL = 15 * 60
+DEFAULT_MIN_TTL = 60
+DEFAULT_MAX_SIZE = 1024
+
+
+def normalize_query(query: str) -> str:
+    # 'São Paulo', 'sao  paulo' and 'SAO PAULO' share one key
+    if query.isascii():
+        return ' '.join(query.casefold().split())
+    decomposed = unicodedata.normalize('NFKD', query)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def get_expiration(
+    data: WeatherData,
+    refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+    min_ttl: float = DEFAULT_MIN_TTL
+) -> float:
+    now = time.time()
+    next_update = data.current.last_updated_epoch + refresh_interval
+    return min(max(next_update, now + min_ttl), now + refresh_interval)
+
+
+class CacheEntry:
+    __slots__ = ('data', 'days', 'expires_at')
+
+    def __init__(self, data: WeatherData, days: int, expires_at: float) -> None:
+        self.data: WeatherData = data
+        self.days: int = days
+        self.expires_at: float = expires_at
+
+
+class WeatherCache:
+    def __init__(
+        self,
+        *,
+        max_size: int = DEFAULT_MAX_SIZE,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        min_ttl: float = DEFAULT_MIN_TTL
+    ) -> None:
+        self.max_size: int = max_size
+        self.refresh_interval: float = refresh_interval
+        self.min_ttl: float = min_ttl
+
+        self._entries: OrderedDict[Tuple[str, int], CacheEntry] = OrderedDict()
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_expiration(self, data: WeatherData) -> float:
+        return get_expiration(data, self.refresh_interval, self.min_ttl)
+
+    def get(self, city: str, days: int, *, max_stale: float = 0) -> Optional[WeatherData]:
+        city = normalize_query(city)
+        # Expired entries are kept until evicted so callers can accept stale data
+        now = time.time()
+        oldest = now - max_stale
+
+        # A forecast with more days also answers requests for fewer days
+        for d in range(days, MAX_FORECAST_DAYS + 1):
+            key = (city, d)
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= oldest:
+                continue
+            self._entries.move_to_end(key)
+            if entry.expires_at > now:
+                self.hits += 1
+                WEATHER_CACHE_REQUESTS.inc(result='hit')
+            else:
+                WEATHER_CACHE_REQUESTS.inc(result='stale')
+            return entry.data
+
+        self.misses += 1
+        WEATHER_CACHE_REQUESTS.inc(result='miss')
+        return None
+
+    def peek(self, city: str, days: int) -> Optional[CacheEntry]:
+        # Same lookup as get, without counting it or refreshing the entry's position
+        city = normalize_query(city)
+        for d in range(days, MAX_FORECAST_DAYS + 1):
+            entry = self._entries.get((city, d))
+            if entry is not None:
+                return entry
+        return None
+
+    def set(self, city: str, days: int, data: WeatherData) -> None:
+        city = normalize_query(city)
+        key = (city, days)
+
+        data.expires_at = self.get_expiration(data)
+        self._entries[key] = CacheEntry(data, days, data.expires_at)
+        self._entries.move_to_end(key)
+
+        # Entries with fewer days are superseded by this one. Current
+        # weather without a forecast is stored with 0 days.
+        for d in range(days):
+            self._entries.pop((city, d), None)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def restore(self, city: str, days: int, data: WeatherData, expires_at: float) -> None:
+        # Entries loaded from a snapshot keep their original expiration
+        key = (normalize_query(city), days)
+        if key in self._entries:
+            return
+
+        data.expires_at = expires_at
+        self._entries[key] = CacheEntry(data, days, expires_at)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def items(self) -> List[Tuple[str, int, CacheEntry]]:
+        # Least recently used first
+        return [(city, days, entry) for (city, days), entry in self._entries.items()]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SingleFlight:
+    def __init__(self, *, counter: Optional[Counter] = WEATHERAPI_DEDUPLICATED) -> None:
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.deduplicated: int = 0
+        self.counter: Optional[Counter] = counter
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.deduplicated += 1
+            if self.counter is not None:
+                self.counter.inc()
+
+        # Shielded so a cancelled waiter doesn't cancel the request for the others
+        return await asyncio.shield(task)
+
+
+class CacheBackend:
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.max_size: int = max_size
+        self._entries: OrderedDict[str, Tuple[bytes, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        now = time.time()
+        values: List[Optional[bytes]] = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            values.append(entry[0] if entry is not None else None)
+        return values
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (value, time.time() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class RedisBackend(CacheBackend):
+    def __init__(self, url: str, *, prefix: str = 'weatherbot:') -> None:
+        if redis is None:
+            raise RuntimeError('The redis package is required to use RedisBackend')
+
+        self.prefix: str = prefix
+        self._redis = redis.from_url(url)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return await self._redis.mget([self.prefix + key for key in keys])
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._redis.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+
+    async def close(self) -> None:
+        await self._redis.aclose()
@@ -0,0 +1,211 @@
+import io
+import os
+import asyncio
+import functools
+import logging
+import aiohttp
+import multiprocessing
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from typing import Optional, Dict, Any, List, Tuple, Set
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+from utils.cache import SingleFlight
+from utils.renderer import get_templates
+from utils.subscriptions import write_atomic
+from utils.translator import Translator
+from utils.types import WeatherData
+from utils.metrics import CARD_RENDER_SECONDS, CARD_CACHE_REQUESTS
+
+
+log = logging.getLogger(__name__)
+
+CARD_SIZE = (640, 320)
+DEFAULT_WORKERS = 2
+DEFAULT_CACHE_SIZE = 256
+# Forking the bot, with its threads and open SQLite connection, can
+# deadlock the workers, so they start from a clean process instead.
+WORKER_START_METHOD = (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+DAY_BACKGROUND = (94, 163, 216)
+NIGHT_BACKGROUND = (35, 52, 84)
+TEXT_COLOR = (255, 255, 255)
+MUTED_TEXT_COLOR = (220, 230, 240)
+
+# (location, last_updated_epoch, locale, units)
+CardKey = Tuple[str, int, str, str]
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size: int) -> Any:
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 only has a fixed size bitmap font
+        return ImageFont.load_default()
+
+
+def _paste_icon(image: Any, path: Optional[str], position: Tuple[int, int], size: int) -> None:
+    if path is None:
+        return
+    try:
+        with Image.open(path) as icon:
+            icon = icon.convert('RGBA').resize((size, size))
+            image.paste(icon, position, icon)
+    except OSError:
+        pass
+
+
+def draw_card(card: Dict[str, Any]) -> bytes:
+    # Runs in a worker process, so it only receives plain values
+    image = Image.new('RGB', CARD_SIZE, DAY_BACKGROUND if card['is_day'] else NIGHT_BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    width, height = CARD_SIZE
+
+    draw.text((24, 20), card['title'], font=_font(26), fill=TEXT_COLOR)
+    _paste_icon(image, card['icon'], (20, 60), 96)
+    draw.text((124, 62), card['temperature'], font=_font(56), fill=TEXT_COLOR)
+    draw.text((124, 128), card['condition'], font=_font(20), fill=MUTED_TEXT_COLOR)
+    draw.text((width - 24, 24), card['details'], font=_font(16), fill=MUTED_TEXT_COLOR,
+              anchor='ra', align='right')
+
+    days: List[Dict[str, Any]] = card['days']
+    if days:
+        column = (width - 32) // len(days)
+        top = height - 140
+        draw.line((16, top - 8, width - 16, top - 8), fill=MUTED_TEXT_COLOR, width=1)
+        for i, day in enumerate(days):
+            x = 16 + i * column + column // 2
+            draw.text((x, top), day['date'], font=_font(18), fill=TEXT_COLOR, anchor='ma')
+            _paste_icon(image, day['icon'], (x - 28, top + 24), 56)
+            draw.text((x, top + 86), day['range'], font=_font(18), fill=TEXT_COLOR, anchor='ma')
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+class CardRenderer:
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        icons_dir: str,
+        *,
+        workers: int = DEFAULT_WORKERS,
+        cache_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        if Image is None:
+            raise RuntimeError('Pillow is required to render weather cards')
+
+        self.session: aiohttp.ClientSession = session
+        self.icons_dir: str = icons_dir
+        self.workers: int = workers
+        self.cache_size: int = cache_size
+
+        self.single_flight: SingleFlight = SingleFlight(counter=None)
+        self._cache: OrderedDict[CardKey, bytes] = OrderedDict()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._icons: Set[str] = set()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _icon_path(self, url: str) -> str:
+        # //cdn.weatherapi.com/weather/64x64/day/116.png -> day_116.png
+        *_, period, name = url.split('/')
+        return os.path.join(self.icons_dir, f'{period}_{name}')
+
+    async def _get_icon(self, url: str) -> Optional[str]:
+        path = self._icon_path(url)
+        if path in self._icons:
+            return path
+        if await asyncio.to_thread(os.path.exists, path):
+            self._icons.add(path)
+            return path
+        return await self.single_flight.run(('icon', path), lambda: self._download_icon(url, path))
+
+    async def _download_icon(self, url: str, path: str) -> Optional[str]:
+        try:
+            async with self.session.get('https:' + url) as res:
+                res.raise_for_status()
+                body = await res.read()
+        except Exception as e:
+            log.warning(f'Failed to download icon {url}', exc_info=e)
+            return None
+
+        await asyncio.to_thread(write_atomic, path, body)
+        self._icons.add(path)
+        return path
+
+    async def _build_card(self, t: Translator, data: WeatherData, units: str) -> Dict[str, Any]:
+        templates = get_templates(t)
+        current = data.current
+        imperial = units == 'imperial'
+
+        urls = list(dict.fromkeys(
+            [current.condition_icon] + [day.condition_icon for day in data.forecast]
+        ))
+        icons = dict(zip(urls, await asyncio.gather(*(self._get_icon(url) for url in urls))))
+
+        return {
+            'title': f'{data.location.name}, {data.location.country}',
+            'is_day': current.is_day,
+            'icon': icons[current.condition_icon],
+            'temperature': f'{current.temp_f:.0f}°F' if imperial else f'{current.temp_c:.0f}°C',
+            'condition': templates.condition(current.condition_code, current.is_day),
+            'details': (
+                f'{t("commands.weather.humidity")}: {current.humidity}%\n'
+                f'{t("commands.weather.wind_speed")}: '
+                + (f'{current.wind_mph:.0f} mph' if imperial else f'{current.wind_kph:.0f} km/h')
+            ),
+            'days': [
+                {
+                    'date': day.date.strftime('%d/%m'),
+                    'icon': icons[day.condition_icon],
+                    'range': (
+                        f'{day.maxtemp_f:.0f}° / {day.mintemp_f:.0f}°' if imperial
+                        else f'{day.maxtemp_c:.0f}° / {day.mintemp_c:.0f}°'
+                    )
+                }
+                for day in data.forecast
+            ]
+        }
+
+    async def _render(self, key: CardKey, t: Translator, data: WeatherData, units: str) -> bytes:
+        card = await self._build_card(t, data, units)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context(WORKER_START_METHOD)
+            )
+        loop = asyncio.get_running_loop()
+        with CARD_RENDER_SECONDS.time():
+            image = await loop.run_in_executor(self._executor, draw_card, card)
+
+        self._cache[key] = image
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return image
+
+    async def render(self, t: Translator, data: WeatherData, units: str = 'metric') -> bytes:
+        key = (data.location.coordinates, data.current.last_updated_epoch, t.locale, units)
+
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+            CARD_CACHE_REQUESTS.inc(result='hit')
+            return image
+
+        CARD_CACHE_REQUESTS.inc(result='miss')
+        return await self.single_flight.run(key, lambda: self._render(key, t, data, units))
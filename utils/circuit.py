@@ -0,0 +1,100 @@
+import enum
+import time
+import logging
+
+from contextlib import contextmanager
+
+from typing import Iterator
+
+from utils.errors import WeatherUnavailable
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIMEOUT = 30.0
+
+
+class CircuitState(enum.IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpen(WeatherUnavailable):
+    translation_id = 'errors.service_unavailable'
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f'Circuit is open, retry after {retry_after:.2f}s')
+        self.retry_after: float = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT,
+        *,
+        name: str = 'circuit'
+    ) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.recovery_timeout: float = recovery_timeout
+        self.name: str = name
+
+        self.state: CircuitState = CircuitState.CLOSED
+        self.failures: int = 0
+        self._opened_at: float = 0
+        self._probing: bool = False
+
+    @property
+    def open(self) -> bool:
+        return self.state is CircuitState.OPEN and \
+            time.monotonic() - self._opened_at < self.recovery_timeout
+
+    def before_request(self) -> None:
+        if self.state is CircuitState.OPEN:
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.recovery_timeout:
+                raise CircuitOpen(self.recovery_timeout - elapsed)
+            self.state = CircuitState.HALF_OPEN
+            log.info(f'{self.name}: half-open, probing for recovery')
+
+        # A single request probes the upstream while the others fail fast
+        if self.state is CircuitState.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpen(0)
+            self._probing = True
+
+    def record_success(self) -> None:
+        if self.state is not CircuitState.CLOSED:
+            log.info(f'{self.name}: closed')
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state is CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state is not CircuitState.OPEN:
+                log.warning(f'{self.name}: open after {self.failures} consecutive failures')
+            self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        self.before_request()
+        try:
+            yield
+        except WeatherUnavailable:
+            # Refused locally, says nothing about the upstream
+            self._probing = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self._probing = False
+            raise
+        else:
+            self.record_success()
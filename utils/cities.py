@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import discord
+
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from discord import app_commands
+
+from typing import Iterable, List, Dict, Any, TYPE_CHECKING
+
+from utils.cache import normalize_query
+
+if TYPE_CHECKING:
+    from bot import BotCore
+
+
+log = logging.getLogger(__name__)
+
+CITIES_FILE = 'assets/cities.txt'
+
+AUTOCOMPLETE_LIMIT = 25
+AUTOCOMPLETE_SEARCH_MIN_LENGTH = 3
+AUTOCOMPLETE_SEARCH_TIMEOUT = 1.5
+
+# Names learned from WeatherAPI search that are kept in the index
+DEFAULT_MAX_ADDED = 2048
+
+# Separates the normalized key from the display name inside an entry
+_SEP = '\0'
+
+
+def format_location(data: Dict[str, Any]) -> str:
+    parts = (data.get('name'), data.get('region'), data.get('country'))
+    return ', '.join(part for part in parts if part)
+
+
+class CityIndex:
+    # Entries are single 'key\0name' strings kept sorted, so a prefix lookup
+    # is a binary search and each city costs one string object.
+    def __init__(self, names: Iterable[str] = (), *, max_added: int = DEFAULT_MAX_ADDED) -> None:
+        self.max_added: int = max_added
+
+        self._entries: List[str] = sorted({normalize_query(n) + _SEP + n for n in names})
+        # Names added at runtime live in a small sorted list of their own,
+        # evicted least recently added first
+        self._added: List[str] = []
+        self._added_order: OrderedDict[str, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._added)
+
+    @classmethod
+    def load(cls, path: str = CITIES_FILE) -> 'CityIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(line.strip() for line in f if line.strip())
+
+    def add(self, name: str) -> bool:
+        entry = normalize_query(name) + _SEP + name
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            return False
+        if entry in self._added_order:
+            self._added_order.move_to_end(entry)
+            return False
+
+        insort(self._added, entry)
+        self._added_order[entry] = None
+        while len(self._added_order) > self.max_added:
+            evicted, _ = self._added_order.popitem(last=False)
+            del self._added[bisect_left(self._added, evicted)]
+        return True
+
+    def search(self, prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[str]:
+        key = normalize_query(prefix)
+        if not key:
+            return []
+
+        matches = sorted(
+            _prefix_matches(self._entries, key, limit) + _prefix_matches(self._added, key, limit)
+        )
+        return [entry[entry.index(_SEP) + 1:] for entry in matches[:limit]]
+
+
+def _prefix_matches(entries: List[str], key: str, limit: int) -> List[str]:
+    results = []
+    i = bisect_left(entries, key)
+    while i < len(entries) and len(results) < limit:
+        entry = entries[i]
+        if not entry.startswith(key):
+            break
+        results.append(entry)
+        i += 1
+    return results
+
+
+async def city_autocomplete(
+    interaction: discord.Interaction,
+    current: str
+) -> List[app_commands.Choice[str]]:
+    bot: 'BotCore' = interaction.client  # type: ignore
+    names = bot.cities.search(current)
+
+    # Fall back to WeatherAPI search only for names that aren't indexed at all
+    if not names and len(normalize_query(current)) >= AUTOCOMPLETE_SEARCH_MIN_LENGTH:
+        try:
+            results = await asyncio.wait_for(
+                bot.weather.search(current),
+                timeout=AUTOCOMPLETE_SEARCH_TIMEOUT
+            )
+        except Exception as e:
+            log.debug(f'City search failed for {current!r}', exc_info=e)
+        else:
+            for result in results:
+                name = format_location(result)
+                bot.cities.add(name)
+                if name not in names:
+                    names.append(name)
+
+    return [
+        app_commands.Choice(name=name[:100], value=name[:100])
+        for name in names[:AUTOCOMPLETE_LIMIT]
+    ]
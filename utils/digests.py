@@ -0,0 +1,199 @@
+import json
+import time
+import heapq
+import asyncio
+import logging
+
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from typing import Optional, Dict, Set, List, Tuple, Any, Callable, Awaitable
+
+from utils.subscriptions import write_atomic
+
+
+log = logging.getLogger(__name__)
+
+# (location, local hour)
+DigestBucket = Tuple[str, int]
+
+
+def next_run(tz_id: str, hour: int, now: float) -> float:
+    try:
+        tz = ZoneInfo(tz_id)
+    except (ZoneInfoNotFoundError, ValueError):
+        log.warning(f'Unknown time zone {tz_id}, using UTC')
+        tz = ZoneInfo('UTC')
+
+    today = datetime.fromtimestamp(now, tz).date()
+    run = datetime.combine(today, dt_time(hour), tzinfo=tz).timestamp()
+    if run > now:
+        return run
+    return datetime.combine(today + timedelta(days=1), dt_time(hour), tzinfo=tz).timestamp()
+
+
+class DigestSubscriptions:
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+
+        # (location, local hour) -> {channel_id: locale}
+        self.buckets: Dict[DigestBucket, Dict[int, str]] = {}
+        self.names: Dict[str, str] = {}
+        self.timezones: Dict[str, str] = {}
+        self._channels: Dict[int, Set[DigestBucket]] = {}
+
+        self._save_lock: asyncio.Lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(channels) for channels in self.buckets.values())
+
+    def load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data: Dict[str, Any] = json.load(f)
+        except FileNotFoundError:
+            return
+
+        for location, entry in data.items():
+            for hour, channels in entry['hours'].items():
+                for channel_id, locale in channels.items():
+                    self.subscribe(
+                        int(channel_id), location, entry['name'], entry['tz_id'], int(hour), locale
+                    )
+
+    async def save(self) -> None:
+        data: Dict[str, Any] = {}
+        for (location, hour), channels in self.buckets.items():
+            entry = data.setdefault(location, {
+                'name': self.names[location],
+                'tz_id': self.timezones[location],
+                'hours': {}
+            })
+            entry['hours'][str(hour)] = {str(k): v for k, v in channels.items()}
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+        async with self._save_lock:
+            await asyncio.to_thread(write_atomic, self.path, payload)
+
+    def get_channel_digests(self, channel_id: int) -> List[Tuple[str, int, str]]:
+        return [
+            (location, hour, self.names[location])
+            for location, hour in self._channels.get(channel_id, ())
+        ]
+
+    def subscribe(
+        self,
+        channel_id: int,
+        location: str,
+        name: str,
+        tz_id: str,
+        hour: int,
+        locale: str
+    ) -> bool:
+        bucket = (location, hour)
+        channels = self.buckets.setdefault(bucket, {})
+        if channel_id in channels:
+            return False
+
+        channels[channel_id] = locale
+        self.names[location] = name
+        self.timezones[location] = tz_id
+        self._channels.setdefault(channel_id, set()).add(bucket)
+        return True
+
+    def unsubscribe(self, channel_id: int, location: str, hour: int) -> bool:
+        bucket = (location, hour)
+        channels = self.buckets.get(bucket)
+        if channels is None or channel_id not in channels:
+            return False
+
+        del channels[channel_id]
+        if not channels:
+            del self.buckets[bucket]
+            if not any(other == location for other, _ in self.buckets):
+                del self.names[location]
+                del self.timezones[location]
+
+        buckets = self._channels[channel_id]
+        buckets.discard(bucket)
+        if not buckets:
+            del self._channels[channel_id]
+        return True
+
+    def remove_channel(self, channel_id: int) -> None:
+        for location, hour in list(self._channels.get(channel_id, ())):
+            self.unsubscribe(channel_id, location, hour)
+
+
+class DigestScheduler:
+    # One timer for every digest: buckets sit in a heap ordered by their next
+    # run, and the loop sleeps until the earliest one is due.
+    def __init__(
+        self,
+        subscriptions: DigestSubscriptions,
+        deliver: Callable[[str, int], Awaitable[None]]
+    ) -> None:
+        self.subscriptions: DigestSubscriptions = subscriptions
+        self.deliver: Callable[[str, int], Awaitable[None]] = deliver
+
+        self._heap: List[Tuple[float, str, int]] = []
+        self._scheduled: Set[DigestBucket] = set()
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._deliveries: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, location: str, hour: int, now: Optional[float] = None) -> None:
+        bucket = (location, hour)
+        if bucket in self._scheduled:
+            return
+
+        if now is None:
+            now = time.time()
+        when = next_run(self.subscriptions.timezones[location], hour, now)
+        heapq.heappush(self._heap, (when, location, hour))
+        self._scheduled.add(bucket)
+        # Wake the loop up if this bucket is due before the one it's waiting for
+        if self._heap[0][0] == when:
+            self._wakeup.set()
+
+    def schedule_all(self) -> None:
+        for location, hour in self.subscriptions.buckets:
+            self.schedule(location, hour)
+
+    async def run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            when, location, hour = heapq.heappop(self._heap)
+            self._scheduled.discard((location, hour))
+            # Buckets without subscribers left are dropped here
+            if (location, hour) not in self.subscriptions.buckets:
+                continue
+
+            # Counted from the due time, so a late wakeup doesn't skip a day
+            self.schedule(location, hour, when)
+            task = asyncio.create_task(self.deliver(location, hour))
+            self._deliveries.add(task)
+            task.add_done_callback(self._delivered)
+
+    def _delivered(self, task: asyncio.Task) -> None:
+        self._deliveries.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error('Failed to deliver digest', exc_info=task.exception())
+
+    def cancel(self) -> None:
+        for task in self._deliveries:
+            task.cancel()
@@ -1,5 +1,7 @@
 import discord
 
+from utils.translator import TranslatorCallable
+
 
 SUCCESS_EMOJI = '✅'
 ERROR_EMOJI = '❌'
@@ -24,3 +26,13 @@ class Embed:
             color=discord.Colour.brand_red(),
             **kwargs
         )
+
+    @staticmethod
+    def api_error(t: TranslatorCallable, code: int) -> discord.Embed:
+        #  City not found
+        if code == 1006:
+            return Embed.error(t('errors.city_not_found'))
+
+        embed = Embed.error(t('errors.request_error'))
+        embed.set_footer(text=t('errors.error_code', error_code=code))
+        return embed
@@ -0,0 +1,3 @@
+class WeatherUnavailable(Exception):
+    # Raised when a request is refused locally instead of being sent to WeatherAPI
+    translation_id: str = 'errors.request_error'
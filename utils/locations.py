@@ -0,0 +1,61 @@
+from collections import OrderedDict
+
+from typing import Optional, Iterator, Tuple
+
+from utils.cache import normalize_query
+
+
+DEFAULT_MAX_ALIASES = 8192
+
+
+class LocationResolver:
+    # Maps the different ways users type a place to the coordinates WeatherAPI
+    # resolved it to, so every spelling shares the same cache entries.
+    def __init__(self, max_size: int = DEFAULT_MAX_ALIASES) -> None:
+        self.max_size: int = max_size
+
+        # normalized query -> canonical id
+        self._aliases: OrderedDict[str, str] = OrderedDict()
+        # canonical id -> query sent upstream, so the location keeps its name
+        self._queries: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def __contains__(self, canonical: str) -> bool:
+        return canonical in self._queries
+
+    def resolve(self, query: str) -> Optional[str]:
+        key = normalize_query(query)
+
+        canonical = self._aliases.get(key)
+        if canonical is not None:
+            self._aliases.move_to_end(key)
+            return canonical
+
+        if key in self._queries:
+            return key
+        return None
+
+    def upstream_query(self, canonical: str) -> str:
+        return self._queries.get(canonical, canonical)
+
+    def add(self, query: str, canonical: str, upstream_query: Optional[str] = None) -> None:
+        key = normalize_query(query)
+
+        self._aliases[key] = canonical
+        self._aliases.move_to_end(key)
+        while len(self._aliases) > self.max_size:
+            self._aliases.popitem(last=False)
+
+        if canonical not in self._queries:
+            self._queries[canonical] = upstream_query or query
+        self._queries.move_to_end(canonical)
+        while len(self._queries) > self.max_size:
+            self._queries.popitem(last=False)
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        return iter(self._aliases.items())
+
+    def queries(self) -> Iterator[Tuple[str, str]]:
+        return iter(self._queries.items())
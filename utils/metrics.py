@@ -0,0 +1,303 @@
+import time
+import logging
+
+from aiohttp import web
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from typing import Dict, Tuple, List, Optional, Callable, Iterator, Sequence
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric:
+    type: str = 'untyped'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        *,
+        registry: Optional['Registry'] = None
+    ) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labels: Tuple[str, ...] = tuple(labels)
+
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}'
+        ]
+        for name, label_names, label_values, value in self.samples():
+            labels = _format_labels(label_names, label_values)
+            lines.append(f'{name}{labels} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        for key, value in self._values.items():
+            yield f'{self.name}_total', self.labels, key, value
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], Dict[LabelValues, float] | float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(self, function: Callable[[], Dict[LabelValues, float] | float]) -> None:
+        # Evaluated on every scrape. Labelled gauges return {label values: value}.
+        self._function = function
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        values = self._values
+        if self._function is not None:
+            result = self._function()
+            values = result if isinstance(result, dict) else {(): result}
+        for key, value in values.items():
+            yield self.name, self.labels, key, value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(
+        self,
+        *args,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * len(self.buckets)
+            self._sums[key] = 0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        bucket_labels = self.labels + ('le',)
+        for key, counts in self._counts.items():
+            total = 0
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                yield f'{self.name}_bucket', bucket_labels, key + (_format_value(bound),), total
+            yield f'{self.name}_sum', self.labels, key, self._sums[key]
+            yield f'{self.name}_count', self.labels, key, total
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class MetricsServer:
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 9100,
+        *,
+        registry: Registry = REGISTRY
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.registry: Registry = registry
+
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(),
+            content_type='text/plain',
+            charset='utf-8',
+            headers={'X-Content-Type-Options': 'nosniff'}
+        )
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        log.info(f'Metrics available at http://{self.host}:{self.port}/metrics')
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# Metrics shared across the bot
+
+WEATHERAPI_REQUEST_SECONDS = Histogram(
+    'weatherapi_request_duration_seconds',
+    'Latency of WeatherAPI requests',
+    ('endpoint',)
+)
+WEATHERAPI_ERRORS = Counter(
+    'weatherapi_errors',
+    'WeatherAPI requests that failed, by error code',
+    ('endpoint', 'code')
+)
+WEATHERAPI_THROTTLED = Counter(
+    'weatherapi_throttled_requests',
+    'WeatherAPI requests refused locally, by reason',
+    ('endpoint', 'reason')
+)
+WEATHERAPI_RATE_LIMIT_TOKENS = Gauge(
+    'weatherapi_rate_limit_tokens',
+    'Tokens available in the WeatherAPI rate limiter'
+)
+WEATHERAPI_QUOTA_USED = Gauge(
+    'weatherapi_quota_used',
+    'WeatherAPI requests made in the current month'
+)
+WEATHERAPI_QUOTA_LIMIT = Gauge(
+    'weatherapi_quota_limit',
+    'Monthly WeatherAPI request quota'
+)
+WEATHERAPI_CIRCUIT_STATE = Gauge(
+    'weatherapi_circuit_state',
+    'State of the WeatherAPI circuit breaker (0 closed, 1 half-open, 2 open)'
+)
+WEATHERAPI_DEDUPLICATED = Counter(
+    'weatherapi_deduplicated_requests',
+    'Requests served by joining an identical in-flight request'
+)
+WEATHER_CACHE_REQUESTS = Counter(
+    'weather_cache_requests',
+    'Weather cache lookups, by result',
+    ('result',)
+)
+WEATHER_CACHE_PREWARMED = Counter(
+    'weather_cache_prewarmed',
+    'Popular forecasts refreshed in the background before they expired'
+)
+SHARED_CACHE_REQUESTS = Counter(
+    'shared_cache_requests',
+    'Shared cache lookups, by result',
+    ('result',)
+)
+COMMAND_FOLLOWUP_SECONDS = Histogram(
+    'command_followup_duration_seconds',
+    'Time between deferring an interaction and sending its followup',
+    ('command',)
+)
+EMBED_BUILD_SECONDS = Histogram(
+    'embed_build_duration_seconds',
+    'Time spent building response embeds',
+    ('command',),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05)
+)
+CARD_RENDER_SECONDS = Histogram(
+    'card_render_duration_seconds',
+    'Time spent rendering weather card images, including the worker round trip'
+)
+CARD_CACHE_REQUESTS = Counter(
+    'card_cache_requests',
+    'Weather card render cache lookups, by result',
+    ('result',)
+)
+COMMAND_COOLDOWN_REJECTIONS = Counter(
+    'command_cooldown_rejections',
+    'Commands rejected because they were on cooldown',
+    ('command',)
+)
+GATEWAY_LATENCY_SECONDS = Gauge(
+    'discord_gateway_latency_seconds',
+    'Latency between a gateway heartbeat and its acknowledgement'
+)
+SHARD_LATENCY_SECONDS = Gauge(
+    'discord_shard_latency_seconds',
+    'Gateway latency of each shard',
+    ('shard',)
+)
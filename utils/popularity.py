@@ -0,0 +1,67 @@
+import math
+import time
+import heapq
+
+from typing import Dict, Hashable, List, Tuple
+
+
+DEFAULT_HALF_LIFE = 60 * 60
+DEFAULT_MAX_SIZE = 4096
+
+
+class PopularityTracker:
+    # Request counts that halve every half_life seconds, so the ranking
+    # follows what is popular now rather than since the bot started.
+    def __init__(
+        self,
+        *,
+        half_life: float = DEFAULT_HALF_LIFE,
+        max_size: int = DEFAULT_MAX_SIZE
+    ) -> None:
+        self.half_life: float = half_life
+        self.max_size: int = max_size
+
+        # Scores are stored relative to _epoch and grow over time instead of
+        # decaying every entry: score * 2 ** ((now - _epoch) / half_life)
+        self._epoch: float = time.time()
+        self._scores: Dict[Hashable, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _weight(self, now: float) -> float:
+        return math.pow(2.0, (now - self._epoch) / self.half_life)
+
+    def _rebase(self, now: float) -> None:
+        # Keeps the weights from overflowing after running for a long time
+        weight = self._weight(now)
+        self._scores = {key: score / weight for key, score in self._scores.items()}
+        self._epoch = now
+
+    def hit(self, key: Hashable) -> None:
+        now = time.time()
+        weight = self._weight(now)
+        if weight > 2.0 ** 64:
+            self._rebase(now)
+            weight = 1.0
+
+        self._scores[key] = self._scores.get(key, 0.0) + weight
+
+        if len(self._scores) > self.max_size * 2:
+            # Forget the least popular keys, amortized over max_size hits
+            self._scores = dict(
+                heapq.nlargest(self.max_size, self._scores.items(), key=lambda item: item[1])
+            )
+
+    def score(self, key: Hashable) -> float:
+        score = self._scores.get(key)
+        if score is None:
+            return 0.0
+        return score / self._weight(time.time())
+
+    def top(self, count: int) -> List[Tuple[Hashable, float]]:
+        weight = self._weight(time.time())
+        return [
+            (key, score / weight)
+            for key, score in heapq.nlargest(count, self._scores.items(), key=lambda item: item[1])
+        ]
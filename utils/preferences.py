@@ -0,0 +1,139 @@
+import asyncio
+import sqlite3
+import threading
+
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple
+
+from utils.cache import SingleFlight
+
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+USER_SCOPE = 'user'
+GUILD_SCOPE = 'guild'
+
+# (scope, user or guild id)
+PreferenceKey = Tuple[str, int]
+# (location, display name)
+SavedLocation = Tuple[str, str]
+
+
+class LocationPreferences:
+    # Default locations saved by users and guilds. Reads go through an LRU
+    # and writes are applied in memory right away and flushed in batches,
+    # so commands never wait for the disk after the first lookup.
+    def __init__(self, path: str, *, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.path: str = path
+        self.cache_size: int = cache_size
+
+        self.single_flight: SingleFlight = SingleFlight(counter=None)
+        # Missing preferences are cached as None too
+        self._cache: OrderedDict[PreferenceKey, Optional[SavedLocation]] = OrderedDict()
+        # Changes waiting to be written, None deletes the row
+        self._pending: Dict[PreferenceKey, Optional[SavedLocation]] = {}
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock: threading.Lock = threading.Lock()
+        self._flush_lock: asyncio.Lock = asyncio.Lock()
+
+    def _open(self) -> None:
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS default_locations ('
+            'scope TEXT NOT NULL, id INTEGER NOT NULL, location TEXT NOT NULL, '
+            'name TEXT NOT NULL, PRIMARY KEY (scope, id))'
+        )
+        db.commit()
+        self._db = db
+
+    def _select(self, key: PreferenceKey) -> Optional[SavedLocation]:
+        assert self._db is not None
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT location, name FROM default_locations WHERE scope = ? AND id = ?',
+                key
+            ).fetchone()
+        return (row[0], row[1]) if row is not None else None
+
+    def _write(self, changes: List[Tuple[PreferenceKey, Optional[SavedLocation]]]) -> None:
+        assert self._db is not None
+        upserts = [(*key, *value) for key, value in changes if value is not None]
+        deletes = [key for key, value in changes if value is None]
+
+        with self._db_lock, self._db:
+            self._db.executemany(
+                'INSERT INTO default_locations (scope, id, location, name) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (scope, id) DO UPDATE SET location = excluded.location, '
+                'name = excluded.name',
+                upserts
+            )
+            self._db.executemany(
+                'DELETE FROM default_locations WHERE scope = ? AND id = ?',
+                deletes
+            )
+
+    def _cache_set(self, key: PreferenceKey, value: Optional[SavedLocation]) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self._open)
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._db is not None:
+            await asyncio.to_thread(self._db.close)
+            self._db = None
+
+    async def get(self, scope: str, id: int) -> Optional[SavedLocation]:
+        key = (scope, id)
+        if key in self._pending:
+            return self._pending[key]
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        value = await self.single_flight.run(key, lambda: asyncio.to_thread(self._select, key))
+        # A value set while the row was being read is newer
+        if key not in self._pending:
+            self._cache_set(key, value)
+            return value
+        return self._pending[key]
+
+    def set(self, scope: str, id: int, location: str, name: str) -> None:
+        key = (scope, id)
+        self._pending[key] = (location, name)
+        self._cache_set(key, (location, name))
+
+    def delete(self, scope: str, id: int) -> None:
+        key = (scope, id)
+        self._pending[key] = None
+        self._cache_set(key, None)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending or self._db is None:
+                return 0
+
+            changes = list(self._pending.items())
+            self._pending = {}
+            try:
+                await asyncio.to_thread(self._write, changes)
+            except Exception:
+                # Newer changes made during the write take precedence
+                for key, value in changes:
+                    self._pending.setdefault(key, value)
+                raise
+            return len(changes)
+
+    async def resolve(self, user_id: int, guild_id: Optional[int]) -> Optional[SavedLocation]:
+        # The user's own default takes precedence over the guild's
+        saved = await self.get(USER_SCOPE, user_id)
+        if saved is None and guild_id is not None:
+            saved = await self.get(GUILD_SCOPE, guild_id)
+        return saved
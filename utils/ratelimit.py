@@ -0,0 +1,134 @@
+import json
+import time
+import asyncio
+import logging
+
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from utils.errors import WeatherUnavailable
+from utils.subscriptions import write_atomic
+
+
+log = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(WeatherUnavailable):
+    translation_id = 'errors.rate_limited'
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f'Rate limited, retry after {retry_after:.2f}s')
+        self.retry_after: float = retry_after
+
+
+class QuotaExceeded(WeatherUnavailable):
+    translation_id = 'errors.rate_limited'
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(f'Monthly quota of {limit} requests exceeded')
+        self.limit: int = limit
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate: float = rate
+        self.capacity: float = capacity if capacity is not None else max(rate, 1)
+
+        self._tokens: float = self.capacity
+        self._updated_at: float = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    async def acquire(self, timeout: float) -> None:
+        self._refill()
+
+        # Tokens may go negative: each waiter reserves its token up front
+        # and sleeps until the bucket has refilled up to its position.
+        wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0
+        if wait > timeout:
+            raise RateLimitExceeded(wait)
+
+        self._tokens -= 1
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class QuotaBudget:
+    def __init__(
+        self,
+        limit: int,
+        *,
+        tight_ratio: float = 0.9,
+        path: Optional[str] = None
+    ) -> None:
+        self.limit: int = limit
+        self.tight_ratio: float = tight_ratio
+        self.path: Optional[str] = path
+
+        self.month: str = self._current_month()
+        self.used: int = 0
+        # Usage as last written to disk
+        self._saved: Tuple[str, int] = (self.month, 0)
+
+    @staticmethod
+    def _current_month() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m')
+
+    def _roll_over(self) -> None:
+        month = self._current_month()
+        if month != self.month:
+            self.month = month
+            self.used = 0
+
+    @property
+    def remaining(self) -> int:
+        self._roll_over()
+        return max(self.limit - self.used, 0)
+
+    @property
+    def tight(self) -> bool:
+        self._roll_over()
+        return self.used >= self.limit * self.tight_ratio
+
+    @property
+    def dirty(self) -> bool:
+        return (self.month, self.used) != self._saved
+
+    def consume(self, amount: int = 1) -> None:
+        self._roll_over()
+        if self.used + amount > self.limit:
+            raise QuotaExceeded(self.limit)
+        self.used += amount
+
+    def load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning('Failed to load quota usage', exc_info=e)
+            return
+
+        if data.get('month') == self._current_month():
+            self.month = data['month']
+            self.used = data['used']
+            self._saved = (self.month, self.used)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        month, used = self.month, self.used
+        data = json.dumps({'month': month, 'used': used}).encode('utf-8')
+        write_atomic(self.path, data)
+        self._saved = (month, used)
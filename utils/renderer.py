@@ -0,0 +1,278 @@
+import discord
+
+from datetime import datetime, timezone
+
+from typing import Dict, List, Tuple, Any, Sequence
+
+from utils.translator import Translator
+from utils.types import WeatherData, WeatherAlert
+from utils.weather_client import WeatherAPIError
+
+
+EMBED_COLOR = 0x5ea3d8
+CITY_NOT_FOUND_ERROR_CODE = 1006
+COMPARE_NAME_WIDTH = 16
+COMPARE_CONDITION_WIDTH = 18
+HOURS_PER_PAGE = 8
+WEATHERAPI_URL = 'https://www.weatherapi.com/'
+
+# Rating of each UV index from 0 to 11, higher values are extreme
+UV_INDEX_RATINGS = (
+    ('low',) * 4 + ('moderate',) * 3 + ('high',) * 2 + ('very_high',) * 3
+)
+
+
+class LocaleTemplates:
+    # Static texts of the weather embeds for a single locale, so rendering
+    # an embed only has to fill in the numbers.
+    __slots__ = (
+        'translator', 'temperature', 'humidity', 'wind_speed', 'uv_index', 'chance_of_rain',
+        'chance_of_snow', 'footer', 'outdated_footer', 'uv_ratings', 'uv_extreme', 'compare_title',
+        'compare_city', 'compare_humidity', 'compare_wind', 'compare_not_found', 'compare_failed',
+        '_conditions'
+    )
+
+    def __init__(self, t: Translator) -> None:
+        self.translator: Translator = t
+
+        self.temperature: str = '🌡 ' + t('commands.weather.temperature')
+        self.humidity: str = '💧 ' + t('commands.weather.humidity')
+        self.wind_speed: str = '💨 ' + t('commands.weather.wind_speed')
+        self.uv_index: str = '☀ ' + t('commands.weather.uv_index')
+        self.chance_of_rain: str = '🌧 ' + t('commands.weather.chance_of_rain')
+        self.chance_of_snow: str = '❄ ' + t('commands.weather.chance_of_snow')
+
+        self.footer: str = WEATHERAPI_URL + ' | ' + t('commands.weather.last_updated')
+        self.outdated_footer: str = '⚠ ' + t('commands.weather.outdated') + ' | ' + self.footer
+
+        self.uv_ratings: Tuple[str, ...] = tuple(
+            t(f'commands.weather.uv_index_rating.{rating}') for rating in UV_INDEX_RATINGS
+        )
+        self.uv_extreme: str = t('commands.weather.uv_index_rating.extreme')
+
+        self.compare_title: str = '🌎 ' + t('commands.weather.compare.title')
+        self.compare_city: str = t('commands.weather.compare.city')
+        self.compare_humidity: str = t('commands.weather.compare.humidity')
+        self.compare_wind: str = t('commands.weather.compare.wind')
+        self.compare_not_found: str = t('commands.weather.compare.not_found')
+        self.compare_failed: str = t('commands.weather.compare.failed')
+
+        self._conditions: Dict[Tuple[int, bool], str] = {}
+
+    def condition(self, code: int, is_day: bool) -> str:
+        key = (code, is_day)
+        try:
+            return self._conditions[key]
+        except KeyError:
+            day_or_night = 'day' if is_day else 'night'
+            text = self.translator(f'commands.weather.codes.{code}.{day_or_night}')
+            self._conditions[key] = text
+            return text
+
+    def uv_rating(self, uv: float) -> str:
+        index = int(uv)
+        if 0 <= index < len(self.uv_ratings):
+            return self.uv_ratings[index]
+        return self.uv_extreme
+
+
+_templates: Dict[str, LocaleTemplates] = {}
+
+
+def get_templates(t: Translator) -> LocaleTemplates:
+    templates = _templates.get(t.locale)
+    # Reloading the locales creates new translators
+    if templates is None or templates.translator is not t:
+        templates = _templates[t.locale] = LocaleTemplates(t)
+    return templates
+
+
+def _timestamp(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+def render_current(t: Translator, data: WeatherData) -> discord.Embed:
+    templates = get_templates(t)
+    location = data.location
+    current = data.current
+
+    embed = discord.Embed.from_dict({
+        'type': 'rich',
+        'title': f'{location.name}, {location.country}',
+        'description': templates.condition(current.condition_code, current.is_day),
+        'color': EMBED_COLOR,
+        'fields': [
+            {
+                'name': templates.temperature,
+                'value': f'{current.temp_c}° C | {current.temp_f}° F',
+                'inline': False
+            },
+            {'name': templates.humidity, 'value': f'{current.humidity}%', 'inline': False},
+            {'name': templates.wind_speed, 'value': f'{current.wind_kph} km/h', 'inline': False},
+            {
+                'name': templates.uv_index,
+                'value': templates.uv_rating(current.uv),
+                'inline': False
+            }
+        ],
+        'footer': {'text': templates.outdated_footer if data.stale else templates.footer},
+        'thumbnail': {'url': 'https:' + current.condition_icon}
+    })
+    embed.timestamp = _timestamp(current.last_updated_epoch)
+    return embed
+
+
+def render_forecast(t: Translator, data: WeatherData) -> List[discord.Embed]:
+    templates = get_templates(t)
+    current = data.current
+    thumbnail = 'https:' + current.condition_icon
+    days = data.forecast
+
+    embeds = []
+    for i, day in enumerate(days, 1):
+        fields = [{
+            'name': templates.temperature,
+            'value': (
+                f'🔼 {day.maxtemp_c}° C | {day.maxtemp_f}° F\n'
+                f'🔽 {day.mintemp_c}° C | {day.mintemp_f}° F'
+            ),
+            'inline': True
+        }]
+        if day.daily_chance_of_rain > 0:
+            fields.append({
+                'name': templates.chance_of_rain,
+                'value': f'{day.daily_chance_of_rain}%',
+                'inline': True
+            })
+        if day.daily_chance_of_snow > 0:
+            fields.append({
+                'name': templates.chance_of_snow,
+                'value': f'{day.daily_chance_of_snow}%',
+                'inline': True
+            })
+
+        embed_data: Dict[str, Any] = {
+            'type': 'rich',
+            'title': f'<t:{day.date_epoch}:d>',
+            'description': templates.condition(day.condition_code, current.is_day),
+            'color': EMBED_COLOR,
+            'fields': fields,
+            'thumbnail': {'url': thumbnail}
+        }
+        if i == 1:
+            embed_data['author'] = {'name': f'{data.location.name}, {data.location.country}'}
+        if i == len(days):
+            embed_data['footer'] = {
+                'text': templates.outdated_footer if data.stale else templates.footer
+            }
+
+        embed = discord.Embed.from_dict(embed_data)
+        if i == len(days):
+            embed.timestamp = _timestamp(current.last_updated_epoch)
+        embeds.append(embed)
+
+    return embeds
+
+
+def render_compare(
+    t: Translator,
+    cities: Sequence[str],
+    results: Sequence[WeatherData | WeatherAPIError]
+) -> discord.Embed:
+    templates = get_templates(t)
+
+    rows = []
+    errors = []
+    for city, result in zip(cities, results):
+        if isinstance(result, WeatherAPIError):
+            reason = (
+                templates.compare_not_found if result.code == CITY_NOT_FOUND_ERROR_CODE
+                else templates.compare_failed
+            )
+            errors.append(f'❌ {city}: {reason}')
+            continue
+
+        current = result.current
+        rows.append((
+            result.location.name[:COMPARE_NAME_WIDTH],
+            f'{current.temp_c:.1f}',
+            f'{current.temp_f:.1f}',
+            f'{current.humidity}%',
+            f'{current.wind_kph:.1f}',
+            templates.condition(current.condition_code, current.is_day)[:COMPARE_CONDITION_WIDTH]
+        ))
+
+    lines = []
+    if rows:
+        header = (templates.compare_city, '°C', '°F', templates.compare_humidity,
+                  templates.compare_wind + ' km/h', '')
+        widths = [max(len(row[i]) for row in (header, *rows)) for i in range(len(header))]
+        table = '\n'.join(
+            '  '.join(
+                value.ljust(width) if i in (0, len(header) - 1) else value.rjust(width)
+                for i, (value, width) in enumerate(zip(row, widths))
+            ).rstrip()
+            for row in (header, *rows)
+        )
+        lines.append(f'```\n{table}\n```')
+    lines.extend(errors)
+
+    return discord.Embed.from_dict({
+        'type': 'rich',
+        'title': templates.compare_title,
+        'description': '\n'.join(lines),
+        'color': EMBED_COLOR,
+        'footer': {'text': WEATHERAPI_URL}
+    })
+
+
+def get_hourly_pages(data: WeatherData) -> List[Tuple[int, int]]:
+    # Pages as (day index, first hour), starting from the current local hour
+    now = data.location.localtime_epoch
+
+    pages = []
+    for i, day in enumerate(data.forecast):
+        times = day.hourly.time_epoch
+        first = 0
+        while first < len(times) and times[first] + 3600 <= now:
+            first += 1
+        pages.extend((i, hour) for hour in range(first, len(times), HOURS_PER_PAGE))
+    return pages
+
+
+def render_hourly_page(t: Translator, data: WeatherData, page: Tuple[int, int]) -> discord.Embed:
+    templates = get_templates(t)
+    day_index, first = page
+    day = data.forecast[day_index]
+    hourly = day.hourly
+
+    lines = []
+    for hour in range(first, min(first + HOURS_PER_PAGE, len(hourly))):
+        line = (
+            f'`{hour:02d}:00` **{hourly.temp_c[hour]:.1f}° C** | {hourly.temp_f[hour]:.1f}° F'
+            f' · {templates.condition(hourly.condition_code[hour], bool(hourly.is_day[hour]))}'
+        )
+        if hourly.chance_of_rain[hour] > 0:
+            line += f' · 🌧 {hourly.chance_of_rain[hour]}%'
+        if hourly.chance_of_snow[hour] > 0:
+            line += f' · ❄ {hourly.chance_of_snow[hour]}%'
+        lines.append(line)
+
+    embed = discord.Embed.from_dict({
+        'type': 'rich',
+        'title': f'🕒 <t:{day.date_epoch}:d>',
+        'description': '\n'.join(lines),
+        'color': EMBED_COLOR,
+        'author': {'name': f'{data.location.name}, {data.location.country}'},
+        'footer': {'text': templates.outdated_footer if data.stale else templates.footer}
+    })
+    embed.timestamp = _timestamp(data.current.last_updated_epoch)
+    return embed
+
+
+def render_alert(alert: WeatherAlert) -> discord.Embed:
+    return discord.Embed(
+        title=alert.headline,
+        description=alert.desc,
+        color=discord.Colour.brand_red()
+    )
@@ -0,0 +1,24 @@
+import json
+
+from typing import Any, Callable
+
+
+JSONLoads = Callable[[bytes | str], Any]
+JSONDumps = Callable[[Any], bytes]
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+if orjson is not None:
+    loads: JSONLoads = orjson.loads
+    dumps: JSONDumps = orjson.dumps
+else:
+    loads = json.loads
+    dumps = _json_dumps
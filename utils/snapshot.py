@@ -0,0 +1,121 @@
+import time
+import struct
+import asyncio
+import logging
+import zlib
+
+from typing import List, Tuple, BinaryIO, Any
+
+from utils.cache import WeatherCache
+from utils.locations import LocationResolver
+from utils.serialization import dumps, loads
+from utils.subscriptions import write_atomic
+from utils.types import WeatherData
+
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'WBSNAP1\n'
+DEFAULT_SNAPSHOT_INTERVAL = 5 * 60
+
+# Length of the compressed locations section
+HEADER = struct.Struct('>I')
+# expires_at, days, city length, data length
+RECORD = struct.Struct('>dBHI')
+
+# (city, days, expires_at, data)
+SnapshotEntry = Tuple[str, int, float, WeatherData]
+
+
+def _read_exactly(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError('Truncated snapshot')
+    return data
+
+
+class CacheSnapshot:
+    # Keeps the weather cache and the resolved locations on disk, so a
+    # restart doesn't send a request upstream for every popular city.
+    def __init__(self, path: str, cache: WeatherCache, locations: LocationResolver) -> None:
+        self.path: str = path
+        self.cache: WeatherCache = cache
+        self.locations: LocationResolver = locations
+
+        self._save_lock: asyncio.Lock = asyncio.Lock()
+
+    def _write(
+        self,
+        aliases: List[Tuple[str, str]],
+        queries: List[Tuple[str, str]],
+        entries: List[SnapshotEntry]
+    ) -> None:
+        locations = zlib.compress(dumps({'aliases': aliases, 'queries': queries}))
+        chunks = [SNAPSHOT_MAGIC, HEADER.pack(len(locations)), locations]
+        for city, days, expires_at, data in entries:
+            key = city.encode('utf-8')
+            value = data.to_bytes()
+            chunks.append(RECORD.pack(expires_at, days, len(key), len(value)))
+            chunks.append(key)
+            chunks.append(value)
+        write_atomic(self.path, b''.join(chunks))
+
+    def _decode(self, now: float) -> Tuple[Any, List[SnapshotEntry]]:
+        entries: List[SnapshotEntry] = []
+        with open(self.path, 'rb') as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError('Not a weather snapshot')
+
+            size, = HEADER.unpack(_read_exactly(f, HEADER.size))
+            locations = loads(zlib.decompress(_read_exactly(f, size)))
+
+            while True:
+                record = f.read(RECORD.size)
+                if not record:
+                    break
+                if len(record) != RECORD.size:
+                    raise EOFError('Truncated snapshot')
+
+                expires_at, days, key_size, value_size = RECORD.unpack(record)
+                if expires_at <= now:
+                    # Expired entries are skipped without being decompressed
+                    f.seek(key_size + value_size, 1)
+                    continue
+
+                city = _read_exactly(f, key_size).decode('utf-8')
+                data = WeatherData.from_bytes(_read_exactly(f, value_size))
+                entries.append((city, days, expires_at, data))
+
+        return locations, entries
+
+    async def save(self) -> int:
+        now = time.time()
+        entries = [
+            (city, days, entry.expires_at, entry.data)
+            for city, days, entry in self.cache.items()
+            if entry.expires_at > now
+        ]
+        aliases = list(self.locations.items())
+        queries = list(self.locations.queries())
+
+        async with self._save_lock:
+            await asyncio.to_thread(self._write, aliases, queries, entries)
+        return len(entries)
+
+    async def load(self) -> int:
+        try:
+            locations, entries = await asyncio.to_thread(self._decode, time.time())
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            log.warning(f'Failed to load cache snapshot {self.path}', exc_info=e)
+            return 0
+
+        for canonical, query in locations['queries']:
+            self.locations.add(query, canonical, query)
+        for alias, canonical in locations['aliases']:
+            self.locations.add(alias, canonical)
+
+        for city, days, expires_at, data in entries:
+            self.cache.restore(city, days, data, expires_at)
+        return len(entries)
@@ -0,0 +1,93 @@
+import os
+import json
+import asyncio
+
+from typing import Dict, Set, List, Tuple, Any
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class AlertSubscriptions:
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+
+        # location -> {channel_id: locale}
+        self.locations: Dict[str, Dict[int, str]] = {}
+        self.names: Dict[str, str] = {}
+        self._channels: Dict[int, Set[str]] = {}
+
+        self._save_lock: asyncio.Lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(channels) for channels in self.locations.values())
+
+    def load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data: Dict[str, Any] = json.load(f)
+        except FileNotFoundError:
+            return
+
+        for location, entry in data.items():
+            for channel_id, locale in entry['channels'].items():
+                self.subscribe(int(channel_id), location, entry['name'], locale)
+
+    async def save(self) -> None:
+        data = {
+            location: {
+                'name': self.names[location],
+                'channels': {str(k): v for k, v in channels.items()}
+            }
+            for location, channels in self.locations.items()
+        }
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+        async with self._save_lock:
+            await asyncio.to_thread(write_atomic, self.path, payload)
+
+    def get_channel_locations(self, channel_id: int) -> List[Tuple[str, str]]:
+        return [
+            (location, self.names[location])
+            for location in self._channels.get(channel_id, ())
+        ]
+
+    def subscribe(self, channel_id: int, location: str, name: str, locale: str) -> bool:
+        channels = self.locations.setdefault(location, {})
+        if channel_id in channels:
+            return False
+
+        channels[channel_id] = locale
+        self.names[location] = name
+        self._channels.setdefault(channel_id, set()).add(location)
+        return True
+
+    def unsubscribe(self, channel_id: int, location: str) -> bool:
+        channels = self.locations.get(location)
+        if channels is None or channel_id not in channels:
+            return False
+
+        del channels[channel_id]
+        if not channels:
+            del self.locations[location]
+            del self.names[location]
+
+        locations = self._channels[channel_id]
+        locations.discard(location)
+        if not locations:
+            del self._channels[channel_id]
+        return True
+
+    def remove_channel(self, channel_id: int) -> None:
+        for location in list(self._channels.get(channel_id, ())):
+            self.unsubscribe(channel_id, location)
@@ -1,29 +1,67 @@
 import os
 import json
+import time
 import discord
 from discord import app_commands
 
-from typing import Optional, Dict, Any, Protocol
-from collections import defaultdict
+from typing import Optional, Dict, Any, Protocol, Tuple, Iterator
 
 
 DEFAULT_LOCALE = discord.Locale.brazil_portuguese
 
-_translations: Dict[str, Dict[str, Any]] = defaultdict(dict)
+# Flat tables of `key -> (template, needs_format)` per locale, with the
+# default locale fallback already merged in.
+_translations: Dict[str, Dict[str, Tuple[str, bool]]] = {}
+
+
+def _flatten(data: Dict[str, Any], prefix: str = '') -> Iterator[Tuple[str, Tuple[str, bool]]]:
+    for key, value in data.items():
+        key = prefix + key
+        if isinstance(value, dict):
+            yield from _flatten(value, key + '.')
+        elif isinstance(value, list):
+            value = ''.join(value)
+            yield key, (value, '{' in value or '}' in value)
+        elif isinstance(value, str):
+            yield key, (value, '{' in value or '}' in value)
+        else:
+            yield key, (str(value), False)
 
 
 class CommandTranslator(app_commands.Translator):
+    def __init__(self) -> None:
+        super().__init__()
+        self._cache: Dict[Tuple[str, str], Optional[str]] = {}
+        self.calls: int = 0
+        self.elapsed: float = 0
+
+    @property
+    def cache_hits(self) -> int:
+        return self.calls - len(self._cache)
+
     async def translate(
         self,
         string: app_commands.locale_str,
         locale: discord.Locale,
         context: app_commands.TranslationContextTypes
     ) -> Optional[str]:
-        if locale.value not in _translations.keys():
-            locale = DEFAULT_LOCALE
-        if not string.extras.get('id'):
+        string_id = string.extras.get('id')
+        if not string_id:
             return None
-        return Translator(locale)(string.extras['id'])
+
+        start = time.perf_counter()
+        self.calls += 1
+
+        # Locales without translations share the default locale results
+        locale_key = locale.value if locale.value in _translations else DEFAULT_LOCALE.value
+        key = (string_id, locale_key)
+        try:
+            result = self._cache[key]
+        except KeyError:
+            result = self._cache[key] = Translator(locale_key)(string_id)
+
+        self.elapsed += time.perf_counter() - start
+        return result
 
 
 class TranslatorCallable(Protocol):
@@ -32,31 +70,50 @@ class TranslatorCallable(Protocol):
 
 
 class Translator:
-    def __init__(self, locale: discord.Locale) -> None:
-        self._locale = locale if isinstance(
-            locale, str) else locale.value
+    _instances: Dict[str, 'Translator'] = {}
+
+    _locale: str
+    _table: Dict[str, Tuple[str, bool]]
+
+    def __new__(cls, locale: discord.Locale | str) -> 'Translator':
+        key = locale if isinstance(locale, str) else locale.value
+
+        self = cls._instances.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self._locale = key if key in _translations else DEFAULT_LOCALE.value
+            self._table = _translations.get(self._locale, {})
+            cls._instances[key] = self
+        return self
+
+    @property
+    def locale(self) -> str:
+        return self._locale
 
     def __call__(self, string: str, **kwargs: Any) -> str:
-        if _translations.get(self._locale) is None:
-            self._locale = DEFAULT_LOCALE.value
+        entry = self._table.get(string)
+        if entry is None:
+            return string
 
-        t = _translations[self._locale]
+        template, needs_format = entry
+        if not needs_format:
+            return template
         try:
-            for k in string.split('.'):
-                t = t[k]
-            if isinstance(t, list):
-                return ''.join(t).format(**kwargs)
-            elif not isinstance(t, str):
-                return str(t)
-            else:
-                return t.format(**kwargs)
+            return template.format(**kwargs)
         except KeyError:
             return string
 
     @staticmethod
     def load_locales(path: str = 'locales') -> None:
-        _translations.clear()
+        raw: Dict[str, Dict[str, Any]] = {}
         for element in os.listdir(path):
             if element.endswith('.json'):
                 with open(f'{path}/{element}', 'r', encoding='utf-8') as f:
-                    _translations[element[:-5]] = json.load(f)
+                    raw[element[:-5]] = json.load(f)
+
+        default = dict(_flatten(raw.get(DEFAULT_LOCALE.value, {})))
+
+        _translations.clear()
+        Translator._instances.clear()
+        for locale, data in raw.items():
+            _translations[locale] = {**default, **dict(_flatten(data))}
@@ -1,9 +1,91 @@
-from typing import Dict, Any, List
+import time
+import zlib
+
+from array import array
+
+from typing import Dict, Any, Iterable, List, Optional
 
 from datetime import datetime
 
+from utils.serialization import JSONLoads, loads as default_loads, dumps
+
+
+# Fields read by the models, everything else in a response is dropped
+LOCATION_FIELDS = ('name', 'region', 'country', 'lat', 'lon', 'tz_id', 'localtime_epoch')
+CURRENT_FIELDS = (
+    'last_updated_epoch', 'temp_c', 'temp_f', 'is_day', 'wind_mph', 'wind_kph', 'wind_degree',
+    'wind_dir', 'pressure_mb', 'pressure_in', 'precip_mm', 'precip_in', 'humidity', 'cloud',
+    'feelslike_c', 'feelslike_f', 'vis_km', 'vis_miles', 'uv', 'gust_mph', 'gust_kph'
+)
+DAY_FIELDS = (
+    'maxtemp_c', 'maxtemp_f', 'mintemp_c', 'mintemp_f', 'avgtemp_c', 'avgtemp_f', 'maxwind_mph',
+    'maxwind_kph', 'totalprecip_mm', 'totalprecip_in', 'totalsnow_cm', 'avgvis_km',
+    'avgvis_miles', 'avghumidity', 'daily_will_it_rain', 'daily_chance_of_rain',
+    'daily_will_it_snow', 'daily_chance_of_snow', 'uv'
+)
+ALERT_FIELDS = (
+    'headline', 'msgtype', 'severity', 'urgency', 'areas', 'category', 'certainty', 'event',
+    'note', 'effective', 'expires', 'desc', 'instruction'
+)
+# Hourly columns and their array type codes
+HOURLY_FIELDS = (
+    ('time_epoch', 'q'), ('temp_c', 'f'), ('temp_f', 'f'), ('is_day', 'B'),
+    ('condition_code', 'H'), ('wind_kph', 'f'), ('precip_mm', 'f'), ('chance_of_rain', 'B'),
+    ('chance_of_snow', 'B')
+)
+
+
+def _pick(data: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    return {field: data[field] for field in fields}
+
+
+def _condition(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {'icon': data['condition']['icon'], 'code': data['condition']['code']}
+
+
+def _trim_hours(hours: List[Dict[str, Any]] | Dict[str, List[Any]]) -> Dict[str, array]:
+    # The API sends one dict per hour, to_bytes() writes one list per column
+    if isinstance(hours, dict):
+        return {field: array(code, hours[field]) for field, code in HOURLY_FIELDS}
+
+    columns = {
+        field: array(code, [hour[field] for hour in hours])
+        for field, code in HOURLY_FIELDS if field != 'condition_code'
+    }
+    columns['condition_code'] = array('H', [hour['condition']['code'] for hour in hours])
+    return columns
+
+
+def _trim_day(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'date_epoch': data['date_epoch'],
+        'day': {**_pick(data['day'], DAY_FIELDS), 'condition': _condition(data['day'])},
+        'hour': _trim_hours(data.get('hour', []))
+    }
+
+
+def trim_response(data: Dict[str, Any]) -> Dict[str, Any]:
+    current = data['current']
+    trimmed: Dict[str, Any] = {
+        'location': _pick(data['location'], LOCATION_FIELDS),
+        'current': {**_pick(current, CURRENT_FIELDS), 'condition': _condition(current)}
+    }
+    forecast = data.get('forecast')
+    if forecast is not None:
+        trimmed['forecast'] = {
+            'forecastday': [_trim_day(day) for day in forecast.get('forecastday', [])]
+        }
+    alerts = data.get('alerts')
+    if alerts is not None:
+        trimmed['alerts'] = {
+            'alert': [_pick(alert, ALERT_FIELDS) for alert in alerts.get('alert', [])]
+        }
+    return trimmed
+
 
 class Location:
+    __slots__ = ('name', 'region', 'country', 'lat', 'lon', 'tz_id', 'localtime_epoch')
+
     def __init__(self, data: Dict[str, Any]) -> None:
         self.name: str = data['name']
         self.region: str = data['region']
@@ -11,12 +93,28 @@ class Location:
         self.lat: float = data['lat']
         self.lon: float = data['lon']
         self.tz_id: str = data['tz_id']
-        self.localtime: datetime = datetime.fromtimestamp(data['localtime_epoch'])
+        self.localtime_epoch: int = data['localtime_epoch']
+
+    @property
+    def localtime(self) -> datetime:
+        return datetime.fromtimestamp(self.localtime_epoch)
+
+    @property
+    def coordinates(self) -> str:
+        # Accepted by WeatherAPI as a query and short enough for custom ids
+        return f'{self.lat},{self.lon}'
 
 
 class CurrentWeather:
+    __slots__ = (
+        'last_updated_epoch', 'temp_c', 'temp_f', 'is_day', 'condition_icon', 'condition_code',
+        'wind_mph', 'wind_kph', 'wind_degree', 'wind_dir', 'pressure_mb', 'pressure_in',
+        'precip_mm', 'precip_in', 'humidity', 'cloud', 'feelslike_c', 'feelslike_f',
+        'vis_km', 'vis_miles', 'uv', 'gust_mph', 'gust_kph'
+    )
+
     def __init__(self, data: Dict[str, Any]) -> None:
-        self.last_updated: datetime = datetime.fromtimestamp(data['last_updated_epoch'])
+        self.last_updated_epoch: int = data['last_updated_epoch']
         self.temp_c: float = data['temp_c']
         self.temp_f: float = data['temp_f']
         self.is_day: bool = True if data['is_day'] else False
@@ -40,34 +138,80 @@ class CurrentWeather:
         self.gust_mph: float = data['gust_mph']
         self.gust_kph: float = data['gust_kph']
 
+    @property
+    def last_updated(self) -> datetime:
+        return datetime.fromtimestamp(self.last_updated_epoch)
+
+
+class HourlyForecast:
+    # Parallel arrays indexed by the local hour, instead of one object per hour
+    __slots__ = (
+        'time_epoch', 'temp_c', 'temp_f', 'is_day', 'condition_code', 'wind_kph',
+        'precip_mm', 'chance_of_rain', 'chance_of_snow'
+    )
+
+    # Shares the arrays built by trim_response(), nothing is copied
+    def __init__(self, columns: Dict[str, array]) -> None:
+        self.time_epoch: array = columns['time_epoch']
+        self.temp_c: array = columns['temp_c']
+        self.temp_f: array = columns['temp_f']
+        self.is_day: array = columns['is_day']
+        self.condition_code: array = columns['condition_code']
+        self.wind_kph: array = columns['wind_kph']
+        self.precip_mm: array = columns['precip_mm']
+        self.chance_of_rain: array = columns['chance_of_rain']
+        self.chance_of_snow: array = columns['chance_of_snow']
+
+    def __len__(self) -> int:
+        return len(self.time_epoch)
+
 
 class ForecastDay:
+    __slots__ = (
+        'date_epoch', 'maxtemp_c', 'maxtemp_f', 'mintemp_c', 'mintemp_f', 'avgtemp_c', 'avgtemp_f',
+        'maxwind_mph', 'maxwind_kph', 'totalprecip_mm', 'totalprecip_in', 'totalsnow_cm',
+        'avgvis_km', 'avgvis_miles', 'avghumidity', 'daily_will_it_rain', 'daily_chance_of_rain',
+        'daily_will_it_snow', 'daily_chance_of_snow', 'condition_icon', 'condition_code', 'uv',
+        'hourly'
+    )
+
     def __init__(self, data: Dict[str, Any]):
-        self.date: datetime = datetime.fromtimestamp(data['date_epoch'])
-        self.maxtemp_c: float = data['day']['maxtemp_c']
-        self.maxtemp_f: float = data['day']['maxtemp_f']
-        self.mintemp_c: float = data['day']['mintemp_c']
-        self.mintemp_f: float = data['day']['mintemp_f']
-        self.avgtemp_c: float = data['day']['avgtemp_c']
-        self.avgtemp_f: float = data['day']['avgtemp_f']
-        self.maxwind_mph: float = data['day']['maxwind_mph']
-        self.maxwind_kph: float = data['day']['maxwind_kph']
-        self.totalprecip_mm: float = data['day']['totalprecip_mm']
-        self.totalprecip_in: float = data['day']['totalprecip_in']
-        self.totalsnow_cm: float = data['day']['totalsnow_cm']
-        self.avgvis_km: float = data['day']['avgvis_km']
-        self.avgvis_miles: float = data['day']['avgvis_miles']
-        self.avghumidity: float = data['day']['avghumidity']
-        self.daily_will_it_rain: int = data['day']['daily_will_it_rain']
-        self.daily_chance_of_rain: int = data['day']['daily_chance_of_rain']
-        self.daily_will_it_snow: int = data['day']['daily_will_it_snow']
-        self.daily_chance_of_snow: int = data['day']['daily_chance_of_snow']
-        self.condition_icon: str = data['day']['condition']['icon']
-        self.condition_code: int = data['day']['condition']['code']
-        self.uv: int = data['day']['uv']
+        day = data['day']
+        self.hourly: HourlyForecast = HourlyForecast(data['hour'])
+        self.date_epoch: int = data['date_epoch']
+        self.maxtemp_c: float = day['maxtemp_c']
+        self.maxtemp_f: float = day['maxtemp_f']
+        self.mintemp_c: float = day['mintemp_c']
+        self.mintemp_f: float = day['mintemp_f']
+        self.avgtemp_c: float = day['avgtemp_c']
+        self.avgtemp_f: float = day['avgtemp_f']
+        self.maxwind_mph: float = day['maxwind_mph']
+        self.maxwind_kph: float = day['maxwind_kph']
+        self.totalprecip_mm: float = day['totalprecip_mm']
+        self.totalprecip_in: float = day['totalprecip_in']
+        self.totalsnow_cm: float = day['totalsnow_cm']
+        self.avgvis_km: float = day['avgvis_km']
+        self.avgvis_miles: float = day['avgvis_miles']
+        self.avghumidity: float = day['avghumidity']
+        self.daily_will_it_rain: int = day['daily_will_it_rain']
+        self.daily_chance_of_rain: int = day['daily_chance_of_rain']
+        self.daily_will_it_snow: int = day['daily_will_it_snow']
+        self.daily_chance_of_snow: int = day['daily_chance_of_snow']
+        self.condition_icon: str = day['condition']['icon']
+        self.condition_code: int = day['condition']['code']
+        self.uv: int = day['uv']
+
+    @property
+    def date(self) -> datetime:
+        return datetime.fromtimestamp(self.date_epoch)
 
 
 class WeatherAlert:
+    __slots__ = (
+        'headline', 'msgtype', 'severity', 'urgency', 'areas', 'category', 'certainty',
+        'event', 'note', 'effective_iso', 'expires_iso', 'desc', 'instruction'
+    )
+
     def __init__(self, data: Dict[str, Any]):
         self.headline: str = data['headline']
         self.msgtype: str = data['msgtype']
@@ -78,19 +222,84 @@ class WeatherAlert:
         self.certainty: str = data['certainty']
         self.event: str = data['event']
         self.note: str = data['note']
-        self.effective: datetime = datetime.fromisoformat(data['effective'])
-        self.expires: datetime = datetime.fromisoformat(data['expires'])
+        self.effective_iso: str = data['effective']
+        self.expires_iso: str = data['expires']
         self.desc: str = data['desc']
         self.instruction: str = data['instruction']
 
+    @property
+    def effective(self) -> datetime:
+        return datetime.fromisoformat(self.effective_iso)
+
+    @property
+    def expires(self) -> datetime:
+        return datetime.fromisoformat(self.expires_iso)
+
 
 class WeatherData:
-    def __init__(self, data: Dict[str, Any]):
-        self.location: Location = Location(data['location'])
-        self.current: CurrentWeather = CurrentWeather(data['current'])
-        self.forecast: List[ForecastDay] = [
-            ForecastDay(day) for day in data['forecast']['forecastday']
-        ]
-        self.alerts: List[WeatherAlert] = [
-            WeatherAlert(alert) for alert in data['alerts']['alert']
-        ]
+    __slots__ = ('raw', 'expires_at', '_location', '_current', '_forecast', '_alerts')
+
+    def __init__(self, data: Dict[str, Any], *, lazy: bool = True):
+        # Only the fields the models read are kept, with the hours as arrays
+        self.raw: Dict[str, Any] = trim_response(data)
+        # Set by the cache when the data is stored
+        self.expires_at: Optional[float] = None
+
+        self._location: Optional[Location] = None
+        self._current: Optional[CurrentWeather] = None
+        self._forecast: Optional[List[ForecastDay]] = None
+        self._alerts: Optional[List[WeatherAlert]] = None
+
+        if not lazy:
+            for attr in ('location', 'current', 'forecast', 'alerts'):
+                getattr(self, attr)
+
+    @classmethod
+    def from_json(cls, data: bytes | str, *, loads: JSONLoads = default_loads) -> 'WeatherData':
+        return cls(loads(data))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'WeatherData':
+        return cls(default_loads(zlib.decompress(data)))
+
+    def to_bytes(self) -> bytes:
+        data = self.raw
+        if 'forecast' in data:
+            days = [
+                {**day, 'hour': {field: column.tolist() for field, column in day['hour'].items()}}
+                for day in data['forecast']['forecastday']
+            ]
+            data = {**data, 'forecast': {'forecastday': days}}
+        return zlib.compress(dumps(data))
+
+    @property
+    def stale(self) -> bool:
+        return self.expires_at is not None and self.expires_at <= time.time()
+
+    @property
+    def location(self) -> Location:
+        if self._location is None:
+            self._location = Location(self.raw['location'])
+        return self._location
+
+    @property
+    def current(self) -> CurrentWeather:
+        if self._current is None:
+            self._current = CurrentWeather(self.raw['current'])
+        return self._current
+
+    @property
+    def forecast(self) -> List[ForecastDay]:
+        if self._forecast is None:
+            self._forecast = [
+                ForecastDay(day) for day in self.raw.get('forecast', {}).get('forecastday', [])
+            ]
+        return self._forecast
+
+    @property
+    def alerts(self) -> List[WeatherAlert]:
+        if self._alerts is None:
+            self._alerts = [
+                WeatherAlert(alert) for alert in self.raw.get('alerts', {}).get('alert', [])
+            ]
+        return self._alerts
@@ -1,59 +1,115 @@
+import re
+import logging
 import discord
 
 from discord import ui, ButtonStyle
 
-from typing import Optional, List, Callable
+from typing import Optional, Callable, Awaitable, ClassVar, Dict, Tuple
 
+from utils.embed import Embed
+from utils.translator import Translator
 
-class EmbedPaginator(ui.View):
-    def __init__(
-        self,
-        embeds: List[discord.Embed],
-        *,
-        check: Optional[Callable[[discord.Interaction], bool]] = None,
-        timeout: Optional[float] = 180
-    ):
-        super().__init__(timeout=timeout)
 
-        assert len(embeds) > 1
-        self.embeds = embeds
+log = logging.getLogger(__name__)
+
+# Handlers receive the interaction, the key and the requested page, and
+# return the embed with the page actually shown and the number of pages.
+PageHandler = Callable[[discord.Interaction, str, int], Awaitable[Tuple[discord.Embed, int, int]]]
 
-        self.check = check
-        if self.check is None:
-            self.check = lambda i: True
 
-        self.index = 0
+class PageButton(
+    ui.DynamicItem[ui.Button],
+    template=r'page:(?P<kind>[a-z]+):(?P<key>[^:]+):(?P<index>\d+):(?P<user_id>\d+):(?P<role>[pcn])'
+):
+    # Pagination that survives restarts: the custom id only says which page
+    # of which content to show, which is rebuilt from the cache on click.
+    handlers: ClassVar[Dict[str, PageHandler]] = {}
 
-        self.current_page.disabled = True
-        self._update_state()
+    def __init__(
+        self,
+        kind: str,
+        key: str,
+        index: int,
+        user_id: int,
+        role: str,
+        *,
+        label: Optional[str] = None,
+        emoji: Optional[str] = None,
+        disabled: bool = False
+    ) -> None:
+        super().__init__(
+            ui.Button(
+                style=ButtonStyle.gray,
+                label=label,
+                emoji=emoji,
+                disabled=disabled,
+                custom_id=f'page:{kind}:{key}:{index}:{user_id}:{role}'
+            )
+        )
+        self.kind: str = kind
+        self.key: str = key
+        self.index: int = index
+        self.user_id: int = user_id
 
-    def _update_state(self) -> None:
-        self.previous_page.disabled = self.index == 0
-        self.next_page.disabled = self.index + 1 == len(self.embeds)
-        self.current_page.label = f'{self.index + 1}/{len(self.embeds)}'
+    @classmethod
+    async def from_custom_id(
+        cls,
+        interaction: discord.Interaction,
+        item: ui.Button,
+        match: re.Match[str]
+    ) -> 'PageButton':
+        return cls(
+            match['kind'],
+            match['key'],
+            int(match['index']),
+            int(match['user_id']),
+            match['role']
+        )
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        if not self.check(interaction):
+        if interaction.user.id != self.user_id:
             await interaction.response.defer()
             return False
         return True
 
-    @ui.button(emoji='◀', style=ButtonStyle.gray)
-    async def previous_page(self, interaction: discord.Interaction, button: ui.Button) -> None:
-        self.index -= 1
-        self._update_state()
+    async def callback(self, interaction: discord.Interaction) -> None:
+        handler = self.handlers.get(self.kind)
+        await interaction.response.defer()
+        if handler is None:
+            return
+
+        try:
+            embed, index, page_count = await handler(interaction, self.key, self.index)
+        except Exception as e:
+            log.warning(f'Failed to show page {self.index} of {self.kind}:{self.key}', exc_info=e)
+            t = Translator(interaction.locale)
+            embed = Embed.error(t('errors.request_error'))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
 
-        embed = self.embeds[self.index]
-        await interaction.response.edit_message(embed=embed, view=self)
+        view = paginator_view(self.kind, self.key, index, page_count, self.user_id)
+        await interaction.edit_original_response(embed=embed, view=view)
 
-    @ui.button()
-    async def current_page(self, interaction: discord.Interaction, button: ui.Button) -> None:
-        pass
 
-    @ui.button(emoji='▶', style=ButtonStyle.gray)
-    async def next_page(self, interaction: discord.Interaction, button: ui.Button) -> None:
-        self.index += 1
-        self._update_state()
+def paginator_view(
+    kind: str,
+    key: str,
+    index: int,
+    page_count: int,
+    user_id: int
+) -> Optional[ui.View]:
+    if page_count <= 1:
+        return None
 
-        embed = self.embeds[self.index]
-        await interaction.response.edit_message(embed=embed, view=self)
+    view = ui.View(timeout=None)
+    view.add_item(PageButton(
+        kind, key, max(index - 1, 0), user_id, 'p', emoji='◀', disabled=index == 0
+    ))
+    view.add_item(PageButton(
+        kind, key, index, user_id, 'c', label=f'{index + 1}/{page_count}', disabled=True
+    ))
+    view.add_item(PageButton(
+        kind, key, min(index + 1, page_count - 1), user_id, 'n', emoji='▶',
+        disabled=index + 1 >= page_count
+    ))
+    return view
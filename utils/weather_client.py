@@ -0,0 +1,490 @@
+import time
+import asyncio
+import logging
+import aiohttp
+
+from contextlib import nullcontext
+
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Set, Sequence, Tuple, ContextManager
+
+from utils.cache import (
+    WeatherCache,
+    CacheBackend,
+    SingleFlight,
+    MAX_FORECAST_DAYS,
+    normalize_query,
+    get_expiration
+)
+from utils.types import WeatherData
+from utils.locations import LocationResolver
+from utils.popularity import PopularityTracker
+from utils.ratelimit import TokenBucket, QuotaBudget, RateLimitExceeded, QuotaExceeded
+from utils.circuit import CircuitBreaker
+from utils.metrics import (
+    WEATHERAPI_REQUEST_SECONDS,
+    WEATHERAPI_ERRORS,
+    WEATHERAPI_THROTTLED,
+    WEATHER_CACHE_PREWARMED,
+    SHARED_CACHE_REQUESTS
+)
+from utils.serialization import JSONLoads, loads as default_loads, dumps
+
+
+log = logging.getLogger(__name__)
+
+WEATHER_API_BASE_URL = 'https://api.weatherapi.com/v1'
+
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 20
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_TOTAL_TIMEOUT = 10.0
+DEFAULT_KEEPALIVE_TIMEOUT = 60.0
+DEFAULT_DNS_CACHE_TTL = 300
+SEARCH_CACHE_SIZE = 512
+SHARED_ALIAS_TTL = 7 * 24 * 60 * 60
+# Returned when the API key's plan doesn't include an endpoint, like bulk requests
+NO_ACCESS_ERROR_CODE = 2009
+DEFAULT_RATE_LIMIT_TIMEOUT = 2.0
+# Expired entries younger than this are served while a refresh runs in the background
+DEFAULT_STALE_WHILE_REVALIDATE = 30 * 60
+# Oldest expired entries served when the upstream is unavailable or the quota is tight
+MAX_STALE = 3 * 60 * 60
+
+
+class WeatherAPIError(Exception):
+    def __init__(self, code: int, message: Optional[str] = None) -> None:
+        super().__init__(message or f'WeatherAPI error code: {code}')
+        self.code: int = code
+
+
+class WeatherClient:
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: str = WEATHER_API_BASE_URL,
+        cache: Optional[WeatherCache] = None,
+        shared_cache: Optional[CacheBackend] = None,
+        locations: Optional[LocationResolver] = None,
+        popularity: Optional[PopularityTracker] = None,
+        connection_limit: int = DEFAULT_CONNECTION_LIMIT,
+        connection_limit_per_host: int = DEFAULT_CONNECTION_LIMIT_PER_HOST,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        total_timeout: float = DEFAULT_TOTAL_TIMEOUT,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        rate_limiter: Optional[TokenBucket] = None,
+        rate_limit_timeout: float = DEFAULT_RATE_LIMIT_TIMEOUT,
+        quota: Optional[QuotaBudget] = None,
+        circuit: Optional[CircuitBreaker] = None,
+        stale_while_revalidate: float = DEFAULT_STALE_WHILE_REVALIDATE,
+        json_loads: JSONLoads = default_loads
+    ) -> None:
+        self.api_key: str = api_key
+        self.base_url: str = base_url.rstrip('/')
+        self.cache: Optional[WeatherCache] = cache
+        self.shared_cache: Optional[CacheBackend] = shared_cache
+        self.locations: LocationResolver = locations or LocationResolver()
+        self.popularity: PopularityTracker = popularity or PopularityTracker()
+        self.single_flight: SingleFlight = SingleFlight()
+        self.rate_limiter: Optional[TokenBucket] = rate_limiter
+        self.rate_limit_timeout: float = rate_limit_timeout
+        self.quota: Optional[QuotaBudget] = quota
+        self.circuit: Optional[CircuitBreaker] = circuit
+        self.stale_while_revalidate: float = stale_while_revalidate
+        self.json_loads: JSONLoads = json_loads
+        self._search_cache: OrderedDict[str, List[Dict[str, Any]]] = OrderedDict()
+        self._background: Set[asyncio.Task] = set()
+        self._bulk_supported: bool = True
+
+        connector = aiohttp.TCPConnector(
+            limit=connection_limit,
+            limit_per_host=connection_limit_per_host,
+            ttl_dns_cache=DEFAULT_DNS_CACHE_TTL,
+            keepalive_timeout=keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=total_timeout,
+            sock_connect=connect_timeout,
+            sock_read=read_timeout
+        )
+        self.session: aiohttp.ClientSession = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            raise_for_status=False
+        )
+
+    async def close(self) -> None:
+        for task in self._background:
+            task.cancel()
+        await self.session.close()
+        if self.shared_cache is not None:
+            await self.shared_cache.close()
+
+    async def _acquire(self, endpoint: str, cost: int = 1, timeout: Optional[float] = None) -> None:
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(
+                    timeout if timeout is not None else self.rate_limit_timeout
+                )
+            if self.quota is not None:
+                self.quota.consume(cost)
+        except RateLimitExceeded:
+            WEATHERAPI_THROTTLED.inc(endpoint=endpoint, reason='rate_limit')
+            raise
+        except QuotaExceeded:
+            WEATHERAPI_THROTTLED.inc(endpoint=endpoint, reason='quota')
+            raise
+
+    def _guard(self) -> ContextManager[None]:
+        return self.circuit.guard() if self.circuit is not None else nullcontext()
+
+    def _error(self, endpoint: str, status: int, data: Any) -> WeatherAPIError:
+        error: Dict[str, Any] = data.get('error', {}) if isinstance(data, dict) else {}
+        code = error.get('code', status)
+        WEATHERAPI_ERRORS.inc(endpoint=endpoint, code=str(code))
+        return WeatherAPIError(code, error.get('message'))
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        *,
+        body: Any = None,
+        cost: int = 1,
+        rate_limit_timeout: Optional[float] = None,
+        **params: Any
+    ) -> Any:
+        params['key'] = self.api_key
+        url = f'{self.base_url}/{endpoint}'
+
+        kwargs: Dict[str, Any] = {'params': params}
+        if body is not None:
+            kwargs['data'] = dumps(body)
+            kwargs['headers'] = {'Content-Type': 'application/json'}
+
+        # Only timeouts, connection errors and 5xx responses trip the circuit
+        with self._guard():
+            await self._acquire(endpoint, cost, rate_limit_timeout)
+
+            start = time.perf_counter()
+            try:
+                async with self.session.request(method, url, **kwargs) as res:
+                    body = await res.read()
+            except Exception as e:
+                WEATHERAPI_ERRORS.inc(endpoint=endpoint, code=type(e).__name__)
+                raise
+            finally:
+                WEATHERAPI_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+
+            # Error pages from proxies aren't JSON, so the status is enough here
+            if res.status >= 500:
+                raise self._error(endpoint, res.status, None)
+
+        try:
+            data = self.json_loads(body)
+        except ValueError:
+            if res.status == 200:
+                raise
+            data = None
+
+        if res.status != 200:
+            raise self._error(endpoint, res.status, data)
+
+        return data
+
+    def _shared_key(self, city: str, days: int) -> str:
+        return f'forecast:{normalize_query(city)}:{days}'
+
+    async def _get_shared(self, city: str, days: int) -> Optional[WeatherData]:
+        assert self.shared_cache is not None
+
+        candidates = range(days, MAX_FORECAST_DAYS + 1)
+        try:
+            values = await self.shared_cache.get_many(
+                [self._shared_key(city, d) for d in candidates]
+            )
+        except Exception as e:
+            log.warning('Shared cache lookup failed', exc_info=e)
+            return None
+
+        for d, value in zip(candidates, values):
+            if value is not None:
+                SHARED_CACHE_REQUESTS.inc(result='hit')
+                weather = WeatherData.from_bytes(value)
+                if self.cache is not None:
+                    self.cache.set(city, d, weather)
+                return weather
+
+        SHARED_CACHE_REQUESTS.inc(result='miss')
+        return None
+
+    async def _set_shared(self, city: str, days: int, weather: WeatherData) -> None:
+        assert self.shared_cache is not None
+
+        if self.cache is not None:
+            expires_at = self.cache.get_expiration(weather)
+        else:
+            expires_at = get_expiration(weather)
+        try:
+            await self.shared_cache.set(
+                self._shared_key(city, days),
+                weather.to_bytes(),
+                expires_at - time.time()
+            )
+        except Exception as e:
+            log.warning('Shared cache update failed', exc_info=e)
+
+    async def _get_shared_alias(self, city: str) -> Optional[str]:
+        assert self.shared_cache is not None
+
+        try:
+            value, = await self.shared_cache.get_many([f'alias:{normalize_query(city)}'])
+        except Exception as e:
+            log.warning('Shared cache lookup failed', exc_info=e)
+            return None
+        if value is None:
+            return None
+
+        canonical, _, query = value.decode('utf-8').partition('\n')
+        self.locations.add(city, canonical, query or None)
+        return canonical
+
+    async def _set_shared_alias(self, city: str, canonical: str) -> None:
+        assert self.shared_cache is not None
+
+        value = f'{canonical}\n{self.locations.upstream_query(canonical)}'
+        try:
+            await self.shared_cache.set(
+                f'alias:{normalize_query(city)}',
+                value.encode('utf-8'),
+                SHARED_ALIAS_TTL
+            )
+        except Exception as e:
+            log.warning('Shared cache update failed', exc_info=e)
+
+    def _resolve(self, city: str) -> str:
+        # Cache key of a query: its canonical location once it's known
+        return self.locations.resolve(city) or normalize_query(city)
+
+    async def _fetch_forecast(self, city: str, days: int) -> WeatherData:
+        canonical = self.locations.resolve(city)
+        if self.shared_cache is not None:
+            if canonical is None:
+                canonical = await self._get_shared_alias(city)
+            if canonical is not None:
+                shared = await self._get_shared(canonical, days)
+                if shared is not None:
+                    return shared
+
+        # Known locations are always requested with the same query, so
+        # every spelling gets the same response.
+        query = self.locations.upstream_query(canonical) if canonical is not None else city
+        data = await self._request('GET', 'forecast.json', q=query, days=days, alerts='yes')
+        weather = WeatherData(data)
+
+        canonical = weather.location.coordinates
+        self.locations.add(city, canonical)
+        if self.cache is not None:
+            self.cache.set(canonical, days, weather)
+        if self.shared_cache is not None:
+            await self._set_shared(canonical, days, weather)
+            await self._set_shared_alias(city, canonical)
+        return weather
+
+    def _revalidate(self, city: str, days: int) -> None:
+        key = (self._resolve(city), days)
+        if key in self.single_flight:
+            return
+
+        task = asyncio.ensure_future(
+            self.single_flight.run(key, lambda: self._fetch_forecast(city, days))
+        )
+        self._background.add(task)
+        task.add_done_callback(self._revalidated)
+
+    def _revalidated(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.debug('Background refresh failed', exc_info=task.exception())
+
+    async def forecast(self, city: str, days: int = 1) -> WeatherData:
+        key = self._resolve(city)
+        self.popularity.hit((key, days))
+
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.get(key, days, max_stale=MAX_STALE)
+            if cached is not None:
+                if not cached.stale:
+                    return cached
+
+                # Close to the monthly quota, expired data is good enough
+                if self.quota is not None and self.quota.tight:
+                    return cached
+
+                assert cached.expires_at is not None
+                if time.time() - cached.expires_at <= self.stale_while_revalidate:
+                    if self.circuit is None or not self.circuit.open:
+                        self._revalidate(city, days)
+                    return cached
+
+        try:
+            return await self.single_flight.run(
+                (key, days),
+                lambda: self._fetch_forecast(city, days)
+            )
+        except Exception:
+            # Outdated data beats an error while the upstream is unavailable
+            if cached is not None:
+                return cached
+            raise
+
+    async def prewarm(self, count: int, budget: int, lead: float) -> int:
+        # Refreshes the most requested forecasts that expire within lead
+        # seconds, spending at most budget upstream requests.
+        if self.cache is None or budget <= 0:
+            return 0
+        if self.circuit is not None and self.circuit.open:
+            return 0
+        if self.quota is not None and self.quota.tight:
+            return 0
+
+        deadline = time.time() + lead
+        due: Dict[Tuple[str, int], None] = {}
+        for (city, days), _ in self.popularity.top(count):
+            key = self._resolve(city)
+            entry = self.cache.peek(key, days)
+            # Evicted entries are left to the next request, it may not come
+            if entry is None or entry.expires_at > deadline:
+                continue
+            if (key, entry.days) in self.single_flight:
+                continue
+            due[(key, entry.days)] = None
+            if len(due) >= budget:
+                break
+
+        results = await asyncio.gather(*(
+            self.single_flight.run(key, lambda key=key: self._fetch_forecast(*key))
+            for key in due
+        ), return_exceptions=True)
+
+        refreshed = 0
+        for key, result in zip(due, results):
+            if isinstance(result, BaseException):
+                log.debug(f'Failed to prewarm {key[0]}: {result}')
+            else:
+                refreshed += 1
+        WEATHER_CACHE_PREWARMED.inc(refreshed)
+        return refreshed
+
+    async def _fetch_bulk(self, cities: Sequence[str]) -> List[WeatherData | WeatherAPIError]:
+        # Each location counts as one call in the monthly quota
+        data = await self._request(
+            'POST',
+            'current.json',
+            body={'locations': [{'q': city, 'custom_id': str(i)} for i, city in enumerate(cities)]},
+            cost=len(cities),
+            q='bulk'
+        )
+
+        results: List[WeatherData | WeatherAPIError] = [
+            WeatherAPIError(0, 'Missing from the bulk response') for _ in cities
+        ]
+        for item in data.get('bulk', []):
+            query = item['query']
+            i = int(query['custom_id'])
+            error = query.get('error')
+            if error is not None:
+                results[i] = WeatherAPIError(error.get('code', 0), error.get('message'))
+                continue
+
+            weather = WeatherData(query)
+            canonical = weather.location.coordinates
+            self.locations.add(cities[i], canonical)
+            if self.cache is not None:
+                self.cache.set(canonical, 0, weather)
+            results[i] = weather
+        return results
+
+    async def _fetch_each(self, cities: Sequence[str]) -> List[WeatherData | WeatherAPIError]:
+        async def fetch(city: str) -> WeatherData | WeatherAPIError:
+            try:
+                return await self.forecast(city, 1)
+            except WeatherAPIError as e:
+                return e
+
+        return await asyncio.gather(*(fetch(city) for city in cities))
+
+    async def current_many(self, cities: Sequence[str]) -> List[WeatherData | WeatherAPIError]:
+        results: List[WeatherData | WeatherAPIError | None] = [None] * len(cities)
+
+        # Cached cities are reused and each distinct location is fetched once
+        missing: Dict[str, List[int]] = {}
+        for i, city in enumerate(cities):
+            key = self._resolve(city)
+            cached = self.cache.get(key, 0) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.setdefault(key, []).append(i)
+
+        if missing:
+            queries = [
+                self.locations.upstream_query(key) if key in self.locations else cities[indexes[0]]
+                for key, indexes in missing.items()
+            ]
+            fetched = None
+            if self._bulk_supported and len(queries) > 1:
+                try:
+                    fetched = await self._fetch_bulk(queries)
+                except WeatherAPIError as e:
+                    if e.code != NO_ACCESS_ERROR_CODE:
+                        raise
+                    log.info('Bulk requests are not available, fetching cities one by one')
+                    self._bulk_supported = False
+            if fetched is None:
+                fetched = await self._fetch_each(queries)
+
+            for indexes, result in zip(missing.values(), fetched):
+                for i in indexes:
+                    results[i] = result
+
+        return results  # type: ignore
+
+    async def _fetch_search(self, query: str) -> List[Dict[str, Any]]:
+        # Suggestions never wait for the rate limiter, so they can't hold up forecasts
+        results = await self._request('GET', 'search.json', rate_limit_timeout=0, q=query)
+        self._search_cache[normalize_query(query)] = results
+        while len(self._search_cache) > SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
+        return results
+
+    async def search(self, query: str) -> List[Dict[str, Any]]:
+        key = normalize_query(query)
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            self._search_cache.move_to_end(key)
+            return cached
+
+        # A shorter query already searched covers this one: nothing found
+        # for it means nothing will be found for a longer one
+        for end in range(len(key) - 1, 0, -1):
+            shorter = self._search_cache.get(key[:end])
+            if shorter is None:
+                continue
+            matches = [r for r in shorter if normalize_query(r.get('name', '')).startswith(key)]
+            if matches or not shorter:
+                return matches
+            break
+
+        # Autocomplete suggestions aren't worth the remaining quota
+        if self.quota is not None and self.quota.tight:
+            return []
+
+        return await self.single_flight.run(
+            ('search', key),
+            lambda: self._fetch_search(query)
+        )